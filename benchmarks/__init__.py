@@ -0,0 +1,5 @@
+"""
+Benchmarks for the crawl, extract and index hot paths.
+
+Run ``python -m benchmarks --help`` for options.
+"""
@@ -0,0 +1,27 @@
+import json
+
+import click
+
+from benchmarks.stages import STAGES, run
+
+
+@click.command()
+@click.option("--pages", type=click.IntRange(min=1), default=100, help="the number of pages per language")
+@click.option("--languages", type=click.IntRange(min=1, max=4), default=1, help="the number of languages")
+@click.option("--depth", type=click.IntRange(min=1), default=3, help="the depth of section nesting")
+@click.option("--sections", type=click.IntRange(min=1), default=2, help="the number of subsections per section")
+@click.option("--paragraphs", type=click.IntRange(min=0), default=3, help="the number of paragraphs per section")
+@click.option("--workers", type=click.IntRange(min=1), default=1, help="the number of processes with which to crawl")
+@click.option("--stage", "stages", type=click.Choice(STAGES), multiple=True, help="a stage to run (default all)")
+@click.argument("args", nargs=-1)
+def benchmark(stages, args, **kwargs):
+    """
+    Benchmark the crawl, extract and index stages on a synthetic Sphinx build, and print a JSON report.
+
+    Any ARGS are passed to the ``index`` command, like ``-- --chunk-size 1000``.
+    """
+    click.echo(json.dumps(run(stages=stages or tuple(STAGES), args=args, **kwargs), indent=2))
+
+
+if __name__ == "__main__":
+    benchmark()
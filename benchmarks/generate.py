@@ -0,0 +1,76 @@
+"""Generate a synthetic Sphinx build."""
+
+import os
+
+LANGUAGES = ("en", "es", "fr", "it")
+
+PARAGRAPH = (
+    "<p>The <strong>Open Contracting Data Standard</strong> enables disclosure of data and documents at all stages of "
+    "the contracting process, by defining a common data model. See the <a href='#'>schema reference</a> and "
+    "<code class='docutils literal notranslate'><span class='pre'>ocid</span></code> for details.</p>\n"
+)
+
+HIGHLIGHT = (
+    '<div class="highlight-json notranslate"><div class="highlight"><pre>'
+    '<span class="p">{</span><span class="nt">"ocid"</span><span class="p">:</span> '
+    '<span class="s2">"ocds-213czf-000-00001"</span><span class="p">}</span></pre></div></div>\n'
+)
+
+
+def _section(identifier, depth, max_depth, sections, paragraphs):
+    parts = [
+        f'<section id="{identifier}">\n',
+        f'<h{min(depth, 6)}>Section {identifier}<a class="headerlink" href="#{identifier}">¶</a></h{min(depth, 6)}>\n',
+        PARAGRAPH * paragraphs,
+        HIGHLIGHT,
+    ]
+    if depth < max_depth:
+        parts.extend(
+            _section(f"{identifier}-{i}", depth + 1, max_depth, sections, paragraphs) for i in range(sections)
+        )
+    parts.append("</section>\n")
+    return "".join(parts)
+
+
+def page(number, *, depth=3, sections=2, paragraphs=3):
+    """
+    Return the HTML of a page.
+
+    :param int number: the page number, used in the title and section IDs
+    :param int depth: the depth of section nesting
+    :param int sections: the number of subsections per section
+    :param int paragraphs: the number of paragraphs per section
+    :rtype: str
+    """
+    return (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset='utf-8'>\n"
+        f"<title>Page {number} &mdash; Open Contracting Data Standard documentation</title>\n"
+        "<script>var DOCUMENTATION_OPTIONS = {};</script>\n</head>\n<body>\n"
+        '<nav class="toc"><ul><li><a href="#">Home</a></li></ul></nav>\n'
+        '<div class="document" role="main">\n'
+        f"{_section(f'page-{number}', 1, depth, sections, paragraphs)}"
+        "</div>\n</body>\n</html>\n"
+    )
+
+
+def generate(directory, *, pages=100, languages=1, **kwargs):
+    """
+    Write a synthetic Sphinx build, with one directory per language and one ``index.html`` file per page.
+
+    :param str directory: the directory in which to write the build
+    :param int pages: the number of pages per language
+    :param int languages: the number of languages, up to 4
+    :param kwargs: keyword arguments to pass to :func:`page`
+    :returns: the number of files written
+    :rtype: int
+    """
+    count = 0
+    for language_code in LANGUAGES[:languages]:
+        for number in range(pages):
+            # Nest pages in groups of 10, like the directories of a documentation website.
+            path = os.path.join(directory, language_code, f"group-{number // 10}", f"page-{number}")
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, "index.html"), "w") as f:
+                f.write(page(number, **kwargs))
+            count += 1
+    return count
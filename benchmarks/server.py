@@ -0,0 +1,103 @@
+"""A local stand-in for the Elasticsearch endpoints used by the ``index`` command, which counts the bytes received."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def respond(self, status, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def read(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with self.server.lock:
+            self.server.stats["requests"] += 1
+            self.server.stats["bytes_received"] += len(data)
+        return data
+
+    def do_HEAD(self):
+        self.read()
+        self.respond(200 if self.path.split("?")[0].strip("/") in self.server.indices else 404)
+
+    def do_GET(self):
+        self.read()
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts[0] == "_alias":
+            alias = parts[-1]
+            if alias in self.server.indices:
+                self.respond(200, {f"{alias}-0001": {"aliases": {alias: {}}}})
+            else:
+                self.respond(404, {"status": 404})
+            return
+        self.respond(200, {"version": {"number": "9.0.0"}, "tagline": "You Know, for Search"})
+
+    def do_PUT(self):
+        if "/_bulk" in self.path:
+            self.bulk()
+            return
+        self.read()
+        with self.server.lock:
+            self.server.indices.add(self.path.split("?")[0].strip("/").split("-")[0])
+        self.respond(200, {"acknowledged": True})
+
+    def do_POST(self):
+        if "/_bulk" in self.path:
+            self.bulk()
+            return
+        self.read()
+        self.respond(200, {"took": 0, "deleted": 0, "updated": 0, "failures": []})
+
+    def bulk(self):
+        items = []
+        lines = iter(line for line in self.read().splitlines() if line)
+        for line in lines:
+            ((op_type, metadata),) = json.loads(line).items()
+            if op_type != "delete":
+                next(lines)
+            items.append({op_type: {"_index": metadata.get("_index"), "_id": metadata.get("_id"), "status": 201}})
+        with self.server.lock:
+            self.server.stats["bulk_requests"] += 1
+            self.server.stats["bulk_items"] += len(items)
+        self.respond(200, {"took": 0, "errors": False, "items": items})
+
+
+class Server(ThreadingHTTPServer):
+    """
+    Serve the stand-in in a background thread.
+
+    ``HEAD`` and ``GET _alias`` requests succeed for indices created with ``PUT``, ``_bulk`` requests succeed for all
+    items, and other requests succeed with an empty result.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.lock = threading.Lock()
+        self.indices = set()
+        self.stats = {"requests": 0, "bytes_received": 0, "bulk_requests": 0, "bulk_items": 0}
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
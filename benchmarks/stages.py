@@ -0,0 +1,148 @@
+"""
+Benchmark stages.
+
+Each stage runs in a new process, so that its peak resident set size (RSS) is measured independently.
+"""
+
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import lxml.html
+from click.testing import CliRunner
+
+from benchmarks.generate import generate
+from benchmarks.server import Server
+from ocdsindex.__main__ import main
+from ocdsindex.allow import allow_sphinx
+from ocdsindex.crawler import Crawler
+from ocdsindex.extract import extract_sphinx
+from ocdsindex.serialize import compress, decompress, dump_ndjson, load, zstd
+
+BASE_URL = "https://standard.open-contracting.org/latest/"
+
+
+def _peak_rss():
+    # Linux reports kibibytes.
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return usage * 1024
+
+
+def crawl(directory, workers, _args):
+    """Crawl the directory, reading, parsing and extracting each file."""
+    start = time.perf_counter()
+    crawler = Crawler(directory, BASE_URL, extract_sphinx, allow=allow_sphinx, workers=workers)
+    documents = sum(len(values) for values in crawler.get_documents_by_language().values())
+    return {"seconds": time.perf_counter() - start, "documents": documents, "peak_rss_bytes": _peak_rss()}
+
+
+def extract(directory, _workers, _args):
+    """Extract documents from pre-parsed files, excluding the time to read and parse."""
+    crawler = Crawler(directory, BASE_URL, extract_sphinx, allow=allow_sphinx)
+    trees = []
+    for paths in crawler.get_paths_by_language().values():
+        for path in paths:
+            with open(path) as f:
+                trees.append((crawler.get_url(path), lxml.html.fromstring(f.read())))
+
+    start = time.perf_counter()
+    documents = sum(len(extract_sphinx(url, tree)) for url, tree in trees)
+    return {"seconds": time.perf_counter() - start, "documents": documents, "peak_rss_bytes": _peak_rss()}
+
+
+def index(directory, _workers, args):
+    """Index the crawled documents, sending bulk requests to a local stand-in for Elasticsearch."""
+    crawler = Crawler(directory, BASE_URL, extract_sphinx, allow=allow_sphinx)
+    filename = os.path.join(directory, "data.ndjson")
+    with open(filename, "w") as f:
+        dump_ndjson(f, BASE_URL, int(time.time()), crawler.get_documents())
+
+    with Server() as server:
+        start = time.perf_counter()
+        result = CliRunner().invoke(main, ["index", server.url, filename, *args])
+        seconds = time.perf_counter() - start
+
+    if result.exception:
+        raise result.exception
+
+    return {
+        "seconds": seconds,
+        "documents": server.stats["bulk_items"],
+        "peak_rss_bytes": _peak_rss(),
+        **server.stats,
+    }
+
+
+def serialize(directory, _workers, _args):
+    """Write the crawled documents as NDJSON, with and without compression and relative URLs, and read them."""
+    crawler = Crawler(directory, BASE_URL, extract_sphinx, allow=allow_sphinx)
+    documents = list(crawler.get_documents())
+    variants = {"ndjson": (None, False), "ndjson+relative": (None, True), "ndjson+relative+gzip": ("gzip", True)}
+    if zstd is not None:
+        variants["ndjson+relative+zstd"] = ("zstd", True)
+
+    formats = {}
+    for name, (compression, relative_urls) in variants.items():
+        filename = os.path.join(directory, f"{name}.ndjson")
+        start = time.perf_counter()
+        with (
+            open(filename, "wb" if compression else "w") as f,
+            compress(f, compression) if compression else nullcontext(f) as text,
+        ):
+            dump_ndjson(text, BASE_URL, int(time.time()), documents, relative_urls=relative_urls)
+        write_seconds = time.perf_counter() - start
+
+        with open(filename, "rb") as f:
+            start = time.perf_counter()
+            _, groups = load(decompress(f))
+            count = sum(1 for _, values in groups for _ in values)
+            formats[name] = {
+                "bytes": os.path.getsize(filename),
+                "write_seconds": write_seconds,
+                "load_seconds": time.perf_counter() - start,
+            }
+
+    return {
+        "seconds": formats["ndjson"]["load_seconds"],
+        "documents": count,
+        "peak_rss_bytes": _peak_rss(),
+        "formats": formats,
+    }
+
+
+STAGES = {"crawl": crawl, "extract": extract, "index": index, "serialize": serialize}
+
+
+def run(*, pages=100, languages=1, depth=3, sections=2, paragraphs=3, workers=1, stages=tuple(STAGES), args=()):
+    """
+    Generate a synthetic Sphinx build, run each stage in a new process, and return a report.
+
+    :param int pages: the number of pages per language
+    :param int languages: the number of languages
+    :param int depth: the depth of section nesting
+    :param int sections: the number of subsections per section
+    :param int paragraphs: the number of paragraphs per section
+    :param int workers: the number of processes with which to crawl
+    :param stages: the names of the stages to run
+    :param args: additional arguments to pass to the ``index`` command
+    :returns: the results for each stage, with rates per second
+    :rtype: dict
+    """
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        files = generate(
+            directory, pages=pages, languages=languages, depth=depth, sections=sections, paragraphs=paragraphs
+        )
+        for name in stages:
+            # "spawn" starts a fresh interpreter, so that RSS isn't inherited from this process.
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                result = executor.submit(STAGES[name], directory, workers, args).result()
+            result["pages_per_second"] = files / result["seconds"]
+            result["documents_per_second"] = result["documents"] / result["seconds"]
+            report[name] = result
+    report["files"] = files
+    return report
@@ -1,15 +1,30 @@
+import functools
+import hashlib
+import importlib.util
+import itertools
 import json
+import queue
 import sys
+import threading
 import time
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager, nullcontext
 from netrc import netrc
 from urllib.parse import urlsplit
 
 import click
-import elasticsearch
 
-from ocdsindex.allow import allow_sphinx
-from ocdsindex.crawler import Crawler
-from ocdsindex.extract import extract_sphinx
+# elasticsearch, lxml and the modules that import lxml are imported by the functions that use them, so that commands
+# start quickly, without importing what they don't use.
+from ocdsindex.exceptions import (
+    InvalidExtractorError,
+    MissingDependencyError,
+    MissingHeadingError,
+    UnknownExtractorError,
+)
+from ocdsindex.serialize import COMPRESSIONS, FORMATS, compress, decompress, dump_json, dump_ndjson, load
+from ocdsindex.stats import NULL, Stats
 
 LANGUAGE_MAP = {
     "en": "english",
@@ -18,6 +33,65 @@ LANGUAGE_MAP = {
     "it": "italian",
 }
 
+# The settings to change while loading documents.
+BULK_LOAD_SETTINGS = {"index.refresh_interval": "-1", "index.number_of_replicas": 0}
+
+# The HTTP libraries with which to connect to Elasticsearch.
+NODE_CLASSES = ("requests", "urllib3", "httpx")
+
+# The maximum number of seconds between retries of failed requests.
+RETRY_BACKOFF_CAP = 60
+
+# The number of seconds between requests for the status of tasks.
+POLL_INTERVAL = 1
+
+# The number of documents whose IDs to look up at once in deduplicate mode.
+MGET_SIZE = 500
+
+# The age after which the timestamp of an unchanged document is updated in incremental mode.
+REFRESH_AFTER = 2592000  # 30 days
+
+# The number of seconds without changes, after which watch checks whether to update the timestamps of documents.
+WATCH_TIMEOUT = 3600
+
+# Add a base URL and URL to a deduplicated document, in which the "base_url" and "url" fields are lists.
+DEDUPLICATE_SCRIPT = """
+if (!ctx._source.base_url.contains(params.base_url)) { ctx._source.base_url.add(params.base_url); }
+if (!ctx._source.url.contains(params.url)) { ctx._source.url.add(params.url); }
+if (params.created_at > ctx._source.created_at) { ctx._source.created_at = params.created_at; }
+"""
+
+# Copy a document, changing its base URL and URL. Add the changed base URL and URLs to a deduplicated document.
+COPY_SCRIPT = """
+if (ctx._source.base_url instanceof List) {
+  List urls = new ArrayList();
+  for (def url : ctx._source.url) {
+    if (url.startsWith(params.source)) { urls.add(url.replace(params.source, params.destination)); }
+  }
+  for (def url : urls) {
+    if (!ctx._source.url.contains(url)) { ctx._source.url.add(url); }
+  }
+  if (!ctx._source.base_url.contains(params.destination)) { ctx._source.base_url.add(params.destination); }
+} else {
+  ctx._source.url = ctx._source.url.replace(params.source, params.destination);
+  ctx._source.base_url = ctx._source.base_url.replace(params.source, params.destination);
+  ctx._id = ctx._source.url;
+}
+"""
+
+# Remove a base URL and its URLs from a deduplicated document, and delete the document if no base URLs remain.
+# Delete a document that isn't deduplicated.
+REMOVE_BASE_URL_SCRIPT = """
+if (ctx._source.base_url instanceof List) {
+  String baseUrl = params.base_url;
+  ctx._source.base_url.removeIf(value -> value == baseUrl);
+  ctx._source.url.removeIf(value -> value.startsWith(baseUrl));
+  if (ctx._source.base_url.isEmpty()) { ctx.op = 'delete'; }
+} else {
+  ctx.op = 'delete';
+}
+"""
+
 
 def create_index(es, index, alias=None):
     # Remove the common prefix and version suffix.
@@ -33,6 +107,7 @@ def create_index(es, index, alias=None):
                 "text": {"type": "text", "analyzer": language},
                 "created_at": {"type": "date"},
                 "base_url": {"type": "keyword"},
+                "hash": {"type": "keyword", "index": False},
             },
         },
     }
@@ -42,7 +117,170 @@ def create_index(es, index, alias=None):
     es.indices.create(**kwargs)
 
 
-def connect(host, **kwargs):
+def parse_index(alias, index):
+    """
+    Return the version and, if the index is a monthly index, the month of an index.
+
+    :param str alias: an ``ocdsindex_XX`` alias
+    :param str index: an ``ocdsindex_XX-NNNN`` index or an ``ocdsindex_XX-NNNN-YYYY.MM`` monthly index
+    :returns: the version and the month, like ``"2020.01"``, or ``None``
+    :rtype: tuple
+    """
+    version, _, month = index[len(alias) + 1 :].partition("-")
+    return int(version), month or None
+
+
+def next_index(alias, index=None):
+    """
+    Return the name of the next versioned index for the alias.
+
+    :param str alias: an ``ocdsindex_XX`` alias
+    :param str index: the ``ocdsindex_XX-NNNN`` or ``ocdsindex_XX-NNNN-YYYY.MM`` index behind the alias, if any
+    :rtype: str
+    """
+    if not index:
+        return f"{alias}-0001"
+    version, month = parse_index(alias, index)
+    if month:
+        return f"{alias}-{version + 1:04d}-{month}"
+    return f"{alias}-{version + 1:04d}"
+
+
+def get_index(es, alias):
+    """Return the index to which the alias points, or ``None`` if the alias doesn't exist."""
+    if not es.indices.exists_alias(name=alias):
+        return None
+    indices = list(es.indices.get_alias(name=alias))
+    if len(indices) > 1:
+        message = f"{alias} points to more than one index"
+        raise click.ClickException(message)
+    return indices[0]
+
+
+def get_write_index(es, alias):
+    """
+    Return the index to which the alias writes documents: its write index, or else the only index to which it points.
+
+    :param es: an Elasticsearch client
+    :param str alias: an ``ocdsindex_XX`` alias
+    :rtype: str
+    """
+    results = es.indices.get_alias(name=alias)
+    for index, result in results.items():
+        if result["aliases"][alias].get("is_write_index"):
+            return index
+    if len(results) > 1:
+        message = f"{alias} points to more than one index, and none is its write index"
+        raise click.ClickException(message)
+    return next(iter(results))
+
+
+def get_monthly_index(es, alias, timestamp):
+    """
+    Return the monthly index behind the alias for the timestamp, creating it if needed.
+
+    :param es: an Elasticsearch client
+    :param str alias: an ``ocdsindex_XX`` alias
+    :param int timestamp: a timestamp, in seconds since the epoch
+    :returns: an ``ocdsindex_XX-NNNN-YYYY.MM`` index, with the current version of the alias' indices
+    :rtype: str
+    """
+    indices = list(es.indices.get_alias(name=alias)) if es.indices.exists_alias(name=alias) else []
+    version = max((parse_index(alias, index)[0] for index in indices), default=1)
+    index = f"{alias}-{version:04d}-{time.strftime('%Y.%m', time.gmtime(timestamp))}"
+    if index not in indices:
+        create_index(es, index)
+        set_write_index(es, alias, [*indices, index])
+    return index
+
+
+def set_write_index(es, alias, indices):
+    """
+    Point the alias to the indices, and make the most recent index its write index, so that documents can be written
+    to the alias while it points to more than one index.
+
+    :param es: an Elasticsearch client
+    :param str alias: an ``ocdsindex_XX`` alias
+    :param list indices: ``ocdsindex_XX-NNNN`` or ``ocdsindex_XX-NNNN-YYYY.MM`` indices
+    """
+    # A monthly index is more recent than an index of the same version without a month.
+    write_index = max(indices, key=lambda index: (parse_index(alias, index)[0], parse_index(alias, index)[1] or ""))
+    # https://www.elastic.co/guide/en/elasticsearch/reference/current/aliases.html#write-index
+    es.indices.update_aliases(
+        actions=[
+            {"add": {"alias": alias, "index": index, "is_write_index": index == write_index}} for index in indices
+        ]
+    )
+
+
+@contextmanager
+def bulk_load_settings(es, index, *, force_merge=False):
+    """
+    Disable refreshes and replicas on the index while loading documents, then restore its settings, even if loading
+    fails, and refresh it.
+
+    :param es: an Elasticsearch client
+    :param str index: an index or alias
+    :param bool force_merge: whether to force merge the index, if loading succeeds
+    """
+    # https://www.elastic.co/guide/en/elasticsearch/reference/current/tune-for-indexing-speed.html
+    original = {
+        name: {key: result["settings"].get(key) for key in BULK_LOAD_SETTINGS}  # None resets to the default
+        for name, result in es.indices.get_settings(
+            index=index, name=list(BULK_LOAD_SETTINGS), flat_settings=True
+        ).items()
+    }
+    es.indices.put_settings(index=index, settings=BULK_LOAD_SETTINGS)
+    try:
+        yield
+    finally:
+        for name, settings in original.items():
+            es.indices.put_settings(index=name, settings=settings)
+        es.indices.refresh(index=index)
+
+    if force_merge:
+        # https://www.elastic.co/guide/en/elasticsearch/reference/current/indices-forcemerge.html
+        es.options(request_timeout=3600).indices.forcemerge(index=index)
+
+
+def bulk_load_options(function):
+    """Add options for the :func:`bulk_load_settings` function to a command."""
+    function = click.option(
+        "--force-merge", is_flag=True, help="force merge the indices after loading documents, with --bulk-load"
+    )(function)
+    return click.option(
+        "--bulk-load",
+        is_flag=True,
+        help="disable refreshes and replicas on the indices while loading documents",
+    )(function)
+
+
+def hash_document(document):
+    """
+    Return a hash of the document's title and text, but not its URL, which is its ID.
+
+    :param dict document: a document to index
+    :rtype: str
+    """
+    return hashlib.sha256(json.dumps([document["title"], document["text"]]).encode()).hexdigest()
+
+
+def connect(host, *, node_class="requests", retry_backoff=0, **kwargs):
+    """
+    Return an Elasticsearch client, authenticated with the credentials for the host in the netrc file, if any.
+
+    :param str host: the connection URI for Elasticsearch
+    :param str node_class: the HTTP library with which to connect, one of ``NODE_CLASSES``
+    :param float retry_backoff: the base of the exponential backoff between retries of failed requests, in seconds,
+                                or 0 to retry immediately
+    :param kwargs: keyword arguments to :class:`elasticsearch.Elasticsearch`, like ``http_compress``,
+                   ``connections_per_node``, ``request_timeout``, ``max_retries`` and ``retry_on_timeout``
+    :rtype: elasticsearch.Elasticsearch
+    """
+    if retry_backoff:
+        kwargs["retry_backoff_base"] = retry_backoff
+        kwargs["retry_backoff_cap"] = RETRY_BACKOFF_CAP
+
     try:
         credentials = netrc().authenticators(urlsplit(host).hostname)
     except FileNotFoundError:
@@ -51,7 +289,359 @@ def connect(host, **kwargs):
         if credentials:
             kwargs["basic_auth"] = (credentials[0], credentials[2])
 
-    return elasticsearch.Elasticsearch([host], node_class="requests", **kwargs)
+    import elasticsearch
+
+    return elasticsearch.Elasticsearch([host], node_class=node_class, **kwargs)
+
+
+def validate_node_class(_ctx, _param, value):
+    if value == "httpx" and importlib.util.find_spec("httpx") is None:
+        message = "httpx requires the httpx package"
+        raise click.BadParameter(message)
+    return value
+
+
+def connection_options(function):
+    """
+    Add options for the :func:`connect` function to a command, and pass them as the command's ``connection``
+    argument.
+    """
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        connection = {
+            "node_class": kwargs.pop("node_class"),
+            "http_compress": kwargs.pop("http_compress"),
+            "connections_per_node": kwargs.pop("connections_per_node"),
+            "request_timeout": kwargs.pop("request_timeout"),
+            "max_retries": kwargs.pop("request_retries"),
+            "retry_on_timeout": kwargs.pop("retry_on_timeout"),
+            "retry_backoff": kwargs.pop("retry_backoff"),
+        }
+        return function(*args, connection=connection, **kwargs)
+
+    for option in reversed(
+        (
+            click.option(
+                "--node-class",
+                type=click.Choice(NODE_CLASSES),
+                default="requests",
+                callback=validate_node_class,
+                help="the HTTP library with which to connect to Elasticsearch",
+            ),
+            click.option("--http-compress", is_flag=True, help="compress request bodies with gzip"),
+            click.option(
+                "--connections-per-node",
+                type=click.IntRange(min=1),
+                default=10,
+                help="the maximum number of connections to Elasticsearch",
+            ),
+            click.option(
+                "--request-timeout",
+                type=click.FloatRange(min=0, min_open=True),
+                default=10,
+                help="the timeout of requests in seconds, other than long-running operations",
+            ),
+            click.option(
+                "--request-retries",
+                type=click.IntRange(min=0),
+                default=3,
+                help="the number of times to retry requests that fail with a 429, 502, 503 or 504 status",
+            ),
+            click.option("--retry-on-timeout", is_flag=True, help="retry requests that time out"),
+            click.option(
+                "--retry-backoff",
+                type=click.FloatRange(min=0),
+                default=0.5,
+                help="the base of the exponential backoff between retries in seconds, or 0 to not wait",
+            ),
+        )
+    ):
+        wrapper = option(wrapper)
+    return wrapper
+
+
+def bulk(es, actions, *, chunk_size=500, max_chunk_bytes=10485760, threads=1, max_retries=3, timeout=None, stats=None):
+    """
+    Send the actions to Elasticsearch in bulk requests, and return the actions that failed.
+
+    The actions are consumed lazily, in chunks of at most ``chunk_size`` actions and ``max_chunk_bytes`` bytes. At most
+    ``threads`` chunks are in flight at once. Actions rejected with a 429 status are retried with exponential backoff.
+
+    :param es: an Elasticsearch client
+    :param actions: the actions, in the format expected by :func:`elasticsearch.helpers.streaming_bulk`
+    :param float timeout: the timeout of each bulk request in seconds, if not the client's
+    :param stats: a :class:`~ocdsindex.stats.Stats` in which to record the size and duration of each chunk
+    :returns: the failed actions' response items
+    :rtype: list
+    """
+    from elasticsearch import helpers
+
+    stats = stats or NULL
+    client = es.options(request_timeout=timeout) if timeout else es
+
+    def send(chunk):
+        start = time.perf_counter()
+        failures = [
+            item
+            for ok, item in helpers.streaming_bulk(
+                client,
+                chunk,
+                chunk_size=chunk_size,
+                max_chunk_bytes=max_chunk_bytes,
+                max_retries=max_retries,
+                raise_on_error=False,
+            )
+            if not ok
+        ]
+        if stats.enabled:
+            seconds = time.perf_counter() - start
+            stats.add_time("bulk", seconds)
+            stats.add_bulk_request(len(chunk), sum(len(json.dumps(action)) for action in chunk), seconds)
+        return failures
+
+    failures = []
+    iterator = iter(actions)
+    chunks = iter(lambda: list(itertools.islice(iterator, chunk_size)), [])
+
+    if threads == 1:
+        for chunk in chunks:
+            failures.extend(send(chunk))
+        return failures
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = set()
+        for chunk in chunks:
+            # Stop reading actions while all threads are busy.
+            if len(pending) >= threads:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    failures.extend(future.result())
+            pending.add(executor.submit(send, chunk))
+        for future in pending:
+            failures.extend(future.result())
+
+    return failures
+
+
+def search_after(es, index, query, *, size=1000, stats=None):
+    """
+    Yield all documents matching the query, using a point in time and ``search_after``, without the limit on the
+    number of results of a single search.
+
+    :param es: an Elasticsearch client
+    :param str index: an index or alias
+    :param dict query: a query
+    :param int size: the number of documents to retrieve per request
+    :param stats: a :class:`~ocdsindex.stats.Stats` in which to record timings
+    """
+    stats = stats or NULL
+    # https://www.elastic.co/guide/en/elasticsearch/reference/current/paginate-search-results.html#search-after
+    pit_id = es.open_point_in_time(index=index, keep_alive="1m")["id"]
+    try:
+        after = None
+        while True:
+            with stats.timer("search"):
+                response = es.search(
+                    pit={"id": pit_id, "keep_alive": "1m"},
+                    query=query,
+                    size=size,
+                    sort=["_shard_doc"],
+                    search_after=after,
+                    track_total_hits=False,
+                )
+            stats.add_took("search", response)
+            hits = response["hits"]["hits"]
+            if not hits:
+                break
+            yield from hits
+            pit_id = response["pit_id"]
+            after = hits[-1]["sort"]
+    finally:
+        es.close_point_in_time(id=pit_id)
+
+
+def get_aliases(es):
+    """Return the names of the ``ocdsindex_XX`` aliases."""
+    return sorted(
+        {result["alias"] for result in es.cat.aliases(format="json") if result["alias"].startswith("ocdsindex_")}
+    )
+
+
+def wait_for_tasks(es, tasks):
+    """
+    Wait for the tasks to complete, printing their progress, and return their responses.
+
+    :param es: an Elasticsearch client
+    :param dict tasks: a dict in which the key is a label and the value is a task ID
+    :returns: a dict in which the key is a label and the value is the task's response, or its error if it failed
+    :rtype: dict
+    """
+    from elasticsearch.exceptions import GeneralAvailabilityWarning
+
+    # https://www.elastic.co/guide/en/elasticsearch/reference/current/tasks.html
+    pending = dict(tasks)
+    responses = {}
+    while pending:
+        for label, task_id in list(pending.items()):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", GeneralAvailabilityWarning)  # the API is in technical preview
+                result = es.tasks.get(task_id=task_id)
+            status = result["task"]["status"]
+            done = sum(status.get(key, 0) for key in ("created", "updated", "deleted", "noops", "version_conflicts"))
+            click.echo(f"{label}: {done}/{status.get('total', 0)}", err=True)
+            if result["completed"]:
+                responses[label] = result.get("error") or result["response"]
+                del pending[label]
+        if pending:
+            time.sleep(POLL_INTERVAL)
+    return responses
+
+
+def echo_failures(failures):
+    """Print the failed actions' errors."""
+    for item in failures:
+        ((op_type, result),) = item.items()
+        click.echo(f"{op_type} {result.get('_id')}: {result.get('status')} {result.get('error')}", err=True)
+
+
+def raise_for_failures(failures):
+    """Print the failed actions' errors, and exit with an error if any actions failed."""
+    echo_failures(failures)
+    if failures:
+        message = f"{len(failures)} bulk actions failed"
+        raise click.ClickException(message)
+
+
+def bulk_options(function):
+    """Add options for the :func:`bulk` function to a command."""
+    for option in reversed(
+        (
+            click.option(
+                "--chunk-size",
+                type=click.IntRange(min=1),
+                default=500,
+                help="the maximum number of actions per request",
+            ),
+            click.option(
+                "--max-chunk-bytes",
+                type=click.IntRange(min=1),
+                default=10485760,
+                help="the maximum size of a request in bytes",
+            ),
+            click.option(
+                "--threads", type=click.IntRange(min=1), default=1, help="the maximum number of concurrent requests"
+            ),
+            click.option(
+                "--max-retries",
+                type=click.IntRange(min=0),
+                default=3,
+                help="the number of times to retry actions that are rejected due to load",
+            ),
+            click.option(
+                "--bulk-timeout",
+                "timeout",
+                type=click.FloatRange(min=0, min_open=True),
+                help="the timeout of bulk requests in seconds, if not --request-timeout",
+            ),
+        )
+    ):
+        function = option(function)
+    return function
+
+
+def concurrency_options(function):
+    """Add options for running operations on languages concurrently to a command."""
+    return click.option(
+        "--concurrency",
+        type=click.IntRange(min=1),
+        default=1,
+        help="the maximum number of languages to process at once",
+    )(function)
+
+
+def validate_extractor(_ctx, _param, value):
+    from ocdsindex.extractors import get_extractor, get_extractors
+
+    try:
+        return get_extractor(value)
+    except InvalidExtractorError as e:
+        raise click.BadParameter(str(e)) from e
+    except UnknownExtractorError as e:
+        names = ", ".join(sorted(get_extractors()))
+        message = f"{value!r} is not one of {names}"
+        raise click.BadParameter(message) from e
+
+
+def extractor_option(function):
+    """Add an --extractor option to a command, and pass the :class:`~ocdsindex.extractors.Extractor` to the command."""
+    return click.option(
+        "--extractor",
+        default="sphinx",
+        callback=validate_extractor,
+        help="the extractor with which to extract documents, like sphinx or sphinx-streaming",
+    )(function)
+
+
+def output_options(function):
+    """Add options for the :func:`write_documents` function to a command."""
+    for option in reversed(
+        (
+            click.option("--format", "format_", type=click.Choice(FORMATS), default="json", help="the output format"),
+            click.option("--compression", type=click.Choice(COMPRESSIONS), help="compress the output"),
+            click.option("--relative-urls", is_flag=True, help="write URLs without the base URL"),
+        )
+    ):
+        function = option(function)
+    return function
+
+
+def write_documents(
+    source, base_url, *, format_="json", compression=None, relative_urls=False, metadata=None, stats=None
+):
+    """
+    Print the base URL, timestamp and documents to index.
+
+    :param source: a :class:`~ocdsindex.crawler.Crawler` or :class:`~ocdsindex.extension_explorer.ExtensionExplorer`
+    :param str base_url: the remote URL at which the documents will be accessible
+    :param str format_: the output format, either ``json`` or ``ndjson``
+    :param str compression: the compression, either ``gzip`` or ``zstd``, if any
+    :param bool relative_urls: whether to write URLs without the base URL
+    :param dict metadata: other keys to write in the header
+    :param stats: a :class:`~ocdsindex.stats.Stats` in which to record timings
+    """
+    created_at = int(time.time())
+    options = {"relative_urls": relative_urls, "metadata": metadata, "stats": stats}
+
+    try:
+        with compress(sys.stdout.buffer, compression) if compression else nullcontext(sys.stdout) as file:
+            if format_ == "ndjson":
+                dump_ndjson(file, base_url, created_at, source.get_documents(), **options)
+            else:
+                dump_json(file, base_url, created_at, source.get_documents_by_language(), **options)
+    except MissingDependencyError as e:
+        raise click.BadParameter(str(e), param_hint="'--compression'") from e
+
+
+def stats_option(function):
+    """
+    Add a --stats option to a command, which prints the command's timings and counters as JSON to standard error, and
+    pass a :class:`~ocdsindex.stats.Stats` (or ``None``, without --stats) as the command's ``stats`` argument.
+    """
+
+    @functools.wraps(function)
+    def wrapper(*args, stats, **kwargs):
+        if not stats:
+            return function(*args, stats=None, **kwargs)
+
+        stats = Stats()
+        try:
+            return function(*args, stats=stats, **kwargs)
+        finally:
+            data = {"command": click.get_current_context().info_name, **stats.as_dict()}
+            click.echo(json.dumps(data), err=True)
+
+    return click.option("--stats", is_flag=True, help="print timings and counters as JSON to standard error")(wrapper)
 
 
 @click.group()
@@ -62,115 +652,803 @@ def main():
 @main.command()
 @click.argument("directory", type=click.Path(exists=True, file_okay=False))
 @click.argument("base-url")
-def sphinx(directory, base_url):
+@click.option(
+    "--workers", type=click.IntRange(min=1), default=1, help="the number of processes with which to parse files"
+)
+@output_options
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="the directory in which to cache the documents to index from each file",
+)
+@click.option(
+    "--cache-max-size",
+    type=click.IntRange(min=0),
+    default=1073741824,
+    help="the maximum size of the cache in bytes",
+)
+@extractor_option
+@click.option(
+    "--manifest",
+    type=click.Path(dir_okay=False),
+    help="skip the languages whose fingerprints are unchanged from this file, which index --manifest writes",
+)
+@click.option(
+    "--fingerprint",
+    type=click.Choice(("stat", "content")),
+    default="stat",
+    help="whether to fingerprint files by their modification times and sizes, or by their contents",
+)
+@stats_option
+def sphinx(directory, base_url, workers, cache_dir, cache_max_size, extractor, manifest, fingerprint, stats, **kwargs):
     """
     Crawl the DIRECTORY of the Sphinx build of the OCDS documentation, generate documents to index, assign documents
     unique URLs from the BASE_URL, and print the base URL, timestamp, and documents as JSON.
+
+    With --manifest, skip the languages whose files are unchanged since the manifest was written, and write the
+    fingerprint of each language and the unchanged languages in the header.
     """
-    documents = Crawler(directory, base_url, extract_sphinx, allow=allow_sphinx).get_documents_by_language()
-    json.dump({"base_url": base_url, "created_at": int(time.time()), "documents": documents}, sys.stdout)
+    from ocdsindex.cache import Cache
+    from ocdsindex.crawler import Crawler
+
+    with Cache(cache_dir, max_size=cache_max_size) if cache_dir else nullcontext() as cache:
+        crawler = Crawler.from_extractor(directory, base_url, extractor, workers=workers, cache=cache, stats=stats)
+
+        metadata = None
+        if manifest:
+            with (stats or NULL).timer("fingerprint"):
+                fingerprints = crawler.get_fingerprints(content=fingerprint == "content")
+            previous = read_manifest(manifest)
+            unchanged = [code for code, value in fingerprints.items() if previous.get(code) == value]
+            crawler.languages = [code for code in fingerprints if code not in unchanged]
+            metadata = {"fingerprints": fingerprints, "unchanged": unchanged}
+
+        write_documents(crawler, base_url, metadata=metadata, stats=stats, **kwargs)
+
+
+def read_manifest(path):
+    """
+    Return the fingerprint of each language in the manifest, or an empty dict if the manifest doesn't exist.
+
+    :param str path: the path to a manifest, as written by ``index --manifest``
+    :rtype: dict
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
 
 
 @main.command()
 @click.argument("file", type=click.File())
-def extension_explorer(file):
+@click.option(
+    "--workers", type=click.IntRange(min=1), default=1, help="the number of processes with which to extract documents"
+)
+@output_options
+@stats_option
+def extension_explorer(file, workers, stats, **kwargs):
     """
     Crawl the Extension Explorer's ``extensions.json`` file, generate documents to index, assign documents unique
     URLs, and print the base URL, timestamp, and documents as JSON.
+
+    The file is read one extension at a time. Each version's README in each language is split into documents, one per
+    section.
     """
-    "https://extensions.open-contracting.org"
+    from ocdsindex.extension_explorer import BASE_URL, ExtensionExplorer
+
+    explorer = ExtensionExplorer(file, workers=workers, stats=stats)
+    write_documents(explorer, BASE_URL, stats=stats, **kwargs)
 
 
 @main.command()
 @click.argument("host")
-@click.argument("file", type=click.File())
-def index(file, host):
+@click.argument("file", type=click.File("rb"))
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="index only new and changed documents, and delete only removed documents",
+)
+@click.option(
+    "--blue-green",
+    is_flag=True,
+    help="build new indices, then atomically update the aliases to point to them",
+)
+@click.option("--monthly", is_flag=True, help="add documents to monthly indices behind each alias")
+@click.option(
+    "--deduplicate",
+    is_flag=True,
+    help="store documents with the same title and text once, with a list of their base URLs and URLs",
+)
+@click.option(
+    "--manifest",
+    type=click.Path(dir_okay=False),
+    help="write the fingerprints from the file to this file, once indexed, for sphinx --manifest",
+)
+@bulk_load_options
+@concurrency_options
+@bulk_options
+@connection_options
+@stats_option
+def index(
+    file,
+    host,
+    incremental,
+    blue_green,
+    monthly,
+    deduplicate,
+    manifest,
+    bulk_load,
+    force_merge,
+    concurrency,
+    connection,
+    stats,
+    **kwargs,
+):
     """
     Add documents to Elasticsearch indices.
 
     Read a JSON file in which the "base_url" key is the remote URL at which the documents will be accessible, and the
-    "documents" key is an object in which the key is a language code and the value is the documents to index.
+    "documents" key is an object in which the key is a language code and the value is the documents to index. Or, read
+    an NDJSON file, in which the first line has the "base_url" key and each subsequent line is a document to index.
 
-    The ``sphinx`` and ``extension-explorer`` commands create such files.
+    The ``sphinx`` and ``extension-explorer`` commands create such files. A file compressed with gzip or zstd is
+    decompressed.
 
     Connect to Elasticsearch and, for each language, create an ``ocdsindex_XX`` alias and ``ocdsindex_XX-0001`` index
     (if needed), delete existing documents matching the base URL, and index the new documents in that language.
+
+    With --incremental, instead compare the hash of each document to the hash of the indexed document, index only new
+    and changed documents, and delete only documents that are no longer present. The timestamp of an unchanged document
+    is updated if it is more than 30 days old, so that it isn't expired.
+
+    With --blue-green, instead, for each language, create a new versioned index (``ocdsindex_XX-NNNN``), copy the
+    documents not matching the base URL into it, and index the new documents. Once all documents are indexed,
+    atomically update the aliases to point to the new indices, and delete the old indices. If any documents fail to
+    index, delete the new indices, and leave the aliases unchanged.
+
+    With --monthly, add new documents to a monthly index (``ocdsindex_XX-NNNN-YYYY.MM``) for the timestamp, so that
+    the expire command can delete whole indices. Changed documents are updated in their existing index.
+
+    With --deduplicate, instead remove the base URL from the indexed documents, and index each document with its hash
+    as its ID, so that documents with the same title and text, like in different versions of the documentation, are
+    stored once. The "base_url" and "url" fields of such documents are lists.
+
+    With --bulk-load, disable refreshes and replicas on each index while loading documents, then restore its settings.
+
+    With --concurrency, process languages in separate threads. The documents in each language must be contiguous in an
+    NDJSON file.
+
+    If the ``sphinx`` command skipped unchanged languages, update the timestamps of their documents, like with
+    --incremental. With --manifest, once all documents are indexed, write the fingerprint of each language to a file,
+    for the ``sphinx`` command to read.
+    """
+    if incremental and blue_green:
+        message = "--incremental and --blue-green are mutually exclusive"
+        raise click.UsageError(message)
+    if monthly and blue_green:
+        message = "--monthly and --blue-green are mutually exclusive"
+        raise click.UsageError(message)
+    for name, value in (("--incremental", incremental), ("--blue-green", blue_green), ("--monthly", monthly)):
+        if deduplicate and value:
+            message = f"--deduplicate and {name} are mutually exclusive"
+            raise click.UsageError(message)
+
+    text = click.get_current_context().with_resource(decompress(file))
+    header, groups = load(text, stats=stats)
+    # The old and new index for each alias, in blue-green mode.
+    indices = {} if blue_green else None
+
+    with connect(host, **connection) as es:
+        try:
+            with ExitStack() as stack:
+                if bulk_load:
+                    lock = threading.Lock()
+
+                    def prepare(index):
+                        with lock:
+                            stack.enter_context(bulk_load_settings(es, index, force_merge=force_merge))
+
+                else:
+                    prepare = None
+
+                options = {
+                    "incremental": incremental,
+                    "monthly": monthly,
+                    "deduplicate": deduplicate,
+                    "prepare": prepare,
+                    "blue_green": indices,
+                    "stats": stats,
+                }
+                if concurrency > 1:
+                    failures = index_concurrently(es, header, groups, concurrency=concurrency, **options, **kwargs)
+                else:
+                    # https://www.elastic.co/guide/en/elasticsearch/reference/7.10/docs-bulk.html
+                    failures = bulk(es, index_actions(es, header, groups, **options), stats=stats, **kwargs)
+        except BaseException:
+            if blue_green:
+                delete_new_indices(es, indices)
+            raise
+
+        if blue_green:
+            if failures:
+                delete_new_indices(es, indices)
+            else:
+                with (stats or NULL).timer("swap_indices"):
+                    swap_indices(es, indices)
+
+        # The documents in unchanged languages aren't in the file, so their timestamps aren't otherwise updated.
+        missing = []
+        for language_code in header.get("unchanged", []):
+            alias = f"ocdsindex_{language_code}"
+            if es.indices.exists_alias(name=alias):
+                with (stats or NULL).timer("update_by_query"):
+                    refresh_created_at(es, alias, header["base_url"], header["created_at"])
+            else:
+                missing.append(language_code)
+                click.echo(f"{language_code}: unchanged, but {alias} doesn't exist", err=True)
+
+    if manifest and "fingerprints" in header and not failures:
+        # Omit the missing languages, so that they aren't skipped next time.
+        fingerprints = {code: value for code, value in header["fingerprints"].items() if code not in missing}
+        with open(manifest, "w") as f:
+            json.dump(fingerprints, f)
+
+    raise_for_failures(failures)
+
+
+def index_concurrently(
+    es,
+    header,
+    groups,
+    *,
+    concurrency,
+    incremental=False,
+    monthly=False,
+    deduplicate=False,
+    prepare=None,
+    blue_green=None,
+    stats=None,
+    **kwargs,
+):
+    """
+    Index the documents in each language in a separate thread, and return the actions that failed.
+
+    At most ``concurrency`` languages are processed at once. The documents in each language must be contiguous.
+    Documents that are read lazily, from an NDJSON file, are passed to their thread via a bounded queue.
+
+    :param es: an Elasticsearch client
+    :param dict header: the file's header, with "base_url" and "created_at" keys
+    :param groups: pairs of a language code and an iterable of documents
+    :param int concurrency: the maximum number of languages to process at once
+    :returns: the failed actions' response items
+    :rtype: list
+    """
+
+    def run(language_code, documents):
+        actions = index_actions(
+            es,
+            header,
+            [(language_code, documents)],
+            incremental=incremental,
+            monthly=monthly,
+            deduplicate=deduplicate,
+            prepare=prepare,
+            blue_green=blue_green,
+            stats=stats,
+        )
+        return bulk(es, actions, stats=stats, **kwargs)
+
+    futures = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for language_code, documents in groups:
+            if language_code in futures:
+                message = f"The documents in {language_code} are not contiguous"
+                raise click.ClickException(message)
+
+            if isinstance(documents, list):
+                futures[language_code] = executor.submit(run, language_code, documents)
+                continue
+
+            documents_queue = queue.Queue(maxsize=kwargs.get("chunk_size", 500))
+            future = executor.submit(run, language_code, iter(documents_queue.get, None))
+            futures[language_code] = future
+            try:
+                for document in documents:
+                    enqueue(documents_queue, document, future)
+            finally:
+                # Let the thread finish, even if reading the file fails.
+                enqueue(documents_queue, None, future)
+
+    return [item for future in futures.values() for item in future.result()]
+
+
+def enqueue(documents_queue, item, future):
+    """Put the item in the queue, or raise the exception of the thread consuming the queue, if it failed."""
+    while True:
+        try:
+            documents_queue.put(item, timeout=POLL_INTERVAL)
+        except queue.Full:
+            if future.done():
+                future.result()
+                return
+        else:
+            return
+
+
+def index_actions(
+    es,
+    header,
+    groups,
+    *,
+    incremental=False,
+    monthly=False,
+    deduplicate=False,
+    prepare=None,
+    blue_green=None,
+    indices=None,
+    stats=None,
+):
+    """
+    Yield the bulk actions to index the documents.
+
+    :param es: an Elasticsearch client
+    :param dict header: the file's header, with "base_url" and "created_at" keys
+    :param groups: pairs of a language code and an iterable of documents
+    :param bool incremental: whether to index only new and changed documents
+    :param bool monthly: whether to add new documents to the monthly index for the timestamp
+    :param bool deduplicate: whether to store documents with the same title and text once
+    :param prepare: a function to call with each index before loading documents into it
+    :param dict blue_green: if not ``None``, create new indices, and set the old and new index for each alias
+    :param dict indices: if not ``None``, set the index of each document, keyed by URL, in incremental mode
+    :param stats: a :class:`~ocdsindex.stats.Stats` in which to record timings and counters
+    """
+    stats = stats or NULL
+    base_url = header["base_url"]
+    created_at = header["created_at"]
+    # The index to which to write documents, for each alias.
+    targets = {}
+    # The hash and index of the indexed documents for each alias, in incremental mode.
+    hashes = {}
+
+    for language_code, documents in groups:
+        alias = f"ocdsindex_{language_code}"
+
+        # An NDJSON file might not group all documents in a language together.
+        if alias not in targets:
+            hashes[alias] = {}
+
+            if not deduplicate:
+                check_not_deduplicated(es, alias)
+
+            if blue_green is None:
+                with stats.timer("create_index"):
+                    if monthly:
+                        targets[alias] = get_monthly_index(es, alias, created_at)
+                    else:
+                        if not es.indices.exists(index=alias):
+                            create_index(es, f"{alias}-0001", alias=alias)
+                        targets[alias] = get_write_index(es, alias)
+                if prepare:
+                    prepare(targets[alias])
+                if incremental:
+                    with stats.timer("get_hashes"):
+                        hashes[alias] = get_hashes(es, alias, base_url)
+                    with stats.timer("update_by_query"):
+                        response = refresh_created_at(es, alias, base_url, created_at)
+                    stats.add_took("update_by_query", response)
+                elif deduplicate:
+                    set_deduplicated(es, alias)
+                    with stats.timer("update_by_query"):
+                        response = remove_base_url(es, alias, base_url)
+                    stats.add_took("update_by_query", response)
+                else:
+                    # https://www.elastic.co/guide/en/elasticsearch/reference/7.10/docs-delete-by-query.html
+                    with stats.timer("delete_by_query"):
+                        response = es.delete_by_query(index=alias, query={"term": {"base_url": base_url}})
+                    stats.add_took("delete_by_query", response)
+            else:
+                old_index = get_index(es, alias)
+                new_index = next_index(alias, old_index)
+                with stats.timer("create_index"):
+                    create_index(es, new_index)
+                targets[alias] = new_index
+                blue_green[alias] = (old_index, new_index)
+                if prepare:
+                    prepare(new_index)
+                if old_index:
+                    with stats.timer("reindex"):
+                        response = copy_other_documents(es, old_index, new_index, base_url)
+                    stats.add_took("reindex", response)
+
+        count = 0
+        # The documents whose IDs to look up, in deduplicate mode.
+        pending = []
+        for document in documents:
+            count += 1
+            document["base_url"] = base_url
+            document["created_at"] = created_at
+            document["hash"] = hash_document(document)
+
+            if deduplicate:
+                stats.increment("index")
+                pending.append(document)
+                if len(pending) == MGET_SIZE:
+                    yield from deduplicated_actions(es, targets[alias], pending, stats=stats)
+                    pending = []
+                continue
+
+            # A changed document is updated in its existing index.
+            hash_, index = hashes[alias].pop(document["url"], (None, targets[alias]))
+            if indices is not None:
+                indices[document["url"]] = index
+            if hash_ != document["hash"]:
+                stats.increment("index")
+                yield {"_index": index, "_id": document["url"], "_source": document}
+            else:
+                stats.increment("unchanged")
+        if pending:
+            yield from deduplicated_actions(es, targets[alias], pending, stats=stats)
+        stats.add_documents(language_code, count)
+
+    # Any remaining documents are no longer present.
+    for remaining in hashes.values():
+        for _id, (_, index) in remaining.items():
+            stats.increment("delete")
+            yield {"_op_type": "delete", "_index": index, "_id": _id}
+
+
+def deduplicated_action(index, document, *, exists=False):
+    """
+    Return a bulk action that adds the document's base URL and URL to the indexed document with the same hash.
+
+    :param str index: an index or alias
+    :param dict document: a document to index, with "base_url", "url", "created_at" and "hash" keys
+    :param bool exists: whether the document is indexed, in which case its title and text aren't sent
+    :rtype: dict
+    """
+    # https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-update.html#upserts
+    action = {
+        "_op_type": "update",
+        "_index": index,
+        "_id": document["hash"],
+        "retry_on_conflict": 3,
+        "script": {
+            "source": DEDUPLICATE_SCRIPT,
+            "params": {key: document[key] for key in ("base_url", "url", "created_at")},
+        },
+    }
+    if not exists:
+        action["upsert"] = {**document, "base_url": [document["base_url"]], "url": [document["url"]]}
+    return action
+
+
+def remove_base_url(es, index, base_url):
+    """
+    Remove the base URL and its URLs from the deduplicated documents matching the base URL, delete those without other
+    base URLs, delete the other documents matching the base URL, and return the response.
+    """
+    # https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-update-by-query.html
+    return es.options(request_timeout=3600).update_by_query(
+        index=index,
+        query={"term": {"base_url": base_url}},
+        script={"source": REMOVE_BASE_URL_SCRIPT, "params": {"base_url": base_url}},
+        conflicts="proceed",
+        refresh=True,
+    )
+
+
+def deduplicated_actions(es, index, documents, *, stats=None):
+    """
+    Yield the bulk actions that add the documents' base URLs and URLs to the indexed documents with the same hashes,
+    after looking up which documents are indexed.
+    """
+    stats = stats or NULL
+    # https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-multi-get.html
+    with stats.timer("mget"):
+        response = es.mget(index=index, ids=[document["hash"] for document in documents], _source=False)
+    existing = {result["_id"] for result in response["docs"] if result.get("found")}
+    for document in documents:
+        yield deduplicated_action(index, document, exists=document["hash"] in existing)
+
+
+def set_deduplicated(es, index):
+    """Record, in the mapping's metadata, that the index has deduplicated documents."""
+    # https://www.elastic.co/guide/en/elasticsearch/reference/current/mapping-meta-field.html
+    es.indices.put_mapping(index=index, meta={"deduplicate": True})
+
+
+def is_deduplicated(es, index):
+    """Return whether the index, or any index behind the alias, has deduplicated documents."""
+    return any(
+        result["mappings"].get("_meta", {}).get("deduplicate")
+        for result in es.indices.get_mapping(index=index).values()
+    )
+
+
+def check_not_deduplicated(es, alias):
+    """
+    Raise an error if the alias has deduplicated documents, which would otherwise be deleted or duplicated by writing
+    documents without ``--deduplicate``.
+    """
+    if es.indices.exists(index=alias) and is_deduplicated(es, alias):
+        message = f"{alias} has deduplicated documents: use index --deduplicate"
+        raise click.ClickException(message)
+
+
+def copy_other_documents(es, old_index, new_index, base_url):
+    """Copy the documents not matching the base URL from the old index to the new index, and return the response."""
+    return reindex_documents(
+        es, old_index, new_index, query={"bool": {"must_not": [{"term": {"base_url": base_url}}]}}
+    )
+
+
+def reindex_documents(es, old_index, new_index, *, query=None, script=None):
     """
-    data = json.load(file)
+    Copy the documents matching the query, or all documents, from the old index to the new index, changing them with
+    the script, if any, and return the response.
+    """
+    source = {"index": old_index}
+    if query:
+        source["query"] = query
+    kwargs = {"script": script} if script else {}
+    # https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-reindex.html
+    response = es.options(request_timeout=3600).reindex(
+        source=source, dest={"index": new_index}, slices="auto", **kwargs
+    )
+    if response["failures"]:
+        for failure in response["failures"]:
+            click.echo(f"{failure.get('id')}: {failure.get('status')} {failure.get('cause')}", err=True)
+        message = f"{len(response['failures'])} documents failed to copy from {old_index} to {new_index}"
+        raise click.ClickException(message)
+    return response
+
+
+def swap_indices(es, indices):
+    """Atomically update each alias to point to its new index, and delete the old indices."""
+    if not indices:
+        return
 
-    with connect(host) as es:
-        body = []
+    actions = []
+    for alias, (old_index, new_index) in indices.items():
+        actions.append({"add": {"alias": alias, "index": new_index}})
+        if old_index:
+            actions.append({"remove": {"alias": alias, "index": old_index}})
+    # https://www.elastic.co/guide/en/elasticsearch/reference/current/indices-aliases.html
+    es.indices.update_aliases(actions=actions)
+
+    for old_index, _ in indices.values():
+        if old_index:
+            es.indices.delete(index=old_index)
 
-        for language_code, documents in data["documents"].items():
-            index = f"ocdsindex_{language_code}"
 
-            if not es.indices.exists(index=index):
-                create_index(es, f"{index}-0001", alias=index)
+def delete_new_indices(es, indices):
+    """Delete the new indices, leaving the aliases unchanged."""
+    for _, new_index in indices.values():
+        es.indices.delete(index=new_index, ignore_unavailable=True)
 
-            # https://www.elastic.co/guide/en/elasticsearch/reference/7.10/docs-delete-by-query.html
-            es.delete_by_query(index=index, query={"term": {"base_url": data["base_url"]}})
 
-            # https://www.elastic.co/guide/en/elasticsearch/reference/7.10/docs-bulk.html
-            for document in documents:
-                document["base_url"] = data["base_url"]
-                document["created_at"] = data["created_at"]
+def get_hashes(es, index, base_url):
+    """Return the hash and index of each indexed document matching the base URL, keyed by ID."""
+    from elasticsearch import helpers
 
-                body.append({"index": {"_index": index, "_id": document["url"]}})
-                body.append(document)
+    return {
+        hit["_id"]: (hit["_source"].get("hash"), hit["_index"])
+        for hit in helpers.scan(es, index=index, query={"query": {"term": {"base_url": base_url}}}, _source=["hash"])
+    }
 
-        es.bulk(operations=body)
+
+def refresh_created_at(es, index, base_url, created_at):
+    """
+    Update the timestamp of documents matching the base URL, if more than :data:`REFRESH_AFTER` seconds old, and return
+    the response.
+    """
+    # https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-update-by-query.html
+    return es.options(request_timeout=3600).update_by_query(
+        index=index,
+        query={
+            "bool": {
+                "filter": [
+                    {"term": {"base_url": base_url}},
+                    {"range": {"created_at": {"lt": created_at - REFRESH_AFTER}}},
+                ]
+            }
+        },
+        script={"source": "ctx._source.created_at = params.created_at", "params": {"created_at": created_at}},
+        conflicts="proceed",
+    )
 
 
 @main.command()
 @click.argument("host")
-def reindex(host):
+@bulk_load_options
+@connection_options
+@stats_option
+def reindex(host, bulk_load, force_merge, connection, stats):
     """
     Reindex documents into new Elasticsearch indices.
 
-    For each ``ocdsindex_XX`` alias, create a new versioned index (``ocdsindex_XX-NNNN``), copy all documents into it,
-    atomically update the alias to point to the new index, and delete the old index.
+    For each index behind an ``ocdsindex_XX`` alias, create a new versioned index (``ocdsindex_XX-NNNN``, or
+    ``ocdsindex_XX-NNNN-YYYY.MM`` for a monthly index) and copy all documents into it. The copies run concurrently, as
+    Elasticsearch tasks, and their progress is printed. Once all copies complete, for each new index with the same
+    number of documents as its old index, atomically update the alias to point to the new index, and delete the old
+    index. Otherwise, delete the new index.
+
+    With --bulk-load, disable refreshes and replicas on each new index while copying documents, then restore its
+    settings.
     """
-    with connect(host) as es:
-        for result in es.cat.aliases(format="json"):
-            alias = result["alias"]
-            if not alias.startswith("ocdsindex_"):
-                continue
+    stats = stats or NULL
 
-            old_index = result["index"]
-            old_version = int(old_index[len(alias) + 1 :])
-            new_index = f"{alias}-{old_version + 1:04d}"
+    with connect(host, **connection) as es:
+        indices = {}
+        # The indices that are the write indices of aliases that point to more than one index, with index --monthly.
+        write_indices = set()
+        tasks = {}
 
-            create_index(es, new_index)
-            es.options(request_timeout=300).reindex(source={"index": old_index}, dest={"index": new_index})
-            es.indices.update_aliases(
-                actions=[
-                    {"add": {"alias": alias, "index": new_index}},
-                    {"remove": {"alias": alias, "index": old_index}},
-                ]
-            )
+        try:
+            with ExitStack() as stack:
+                for result in es.cat.aliases(format="json"):
+                    alias = result["alias"]
+                    if not alias.startswith("ocdsindex_"):
+                        continue
+
+                    old_index = result["index"]
+                    new_index = next_index(alias, old_index)
+
+                    with stats.timer("create_index"):
+                        create_index(es, new_index)
+                        if is_deduplicated(es, old_index):
+                            set_deduplicated(es, new_index)
+                    indices[old_index] = (alias, new_index)
+                    if result.get("is_write_index") == "true":
+                        write_indices.add(old_index)
+                    if bulk_load:
+                        stack.enter_context(bulk_load_settings(es, new_index, force_merge=force_merge))
+
+                    # https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-reindex.html#docs-reindex-slice
+                    tasks[old_index] = es.reindex(
+                        source={"index": old_index},
+                        dest={"index": new_index},
+                        slices="auto",
+                        wait_for_completion=False,
+                    )["task"]
+
+                with stats.timer("reindex"):
+                    responses = wait_for_tasks(es, tasks)
+        except BaseException:
+            for _, new_index in indices.values():
+                es.indices.delete(index=new_index, ignore_unavailable=True)
+            raise
+
+        errors = []
+        for old_index, (alias, new_index) in indices.items():
+            stats.add_took("reindex", responses[old_index])
+            stats.increment("created", responses[old_index].get("created", 0))
+            error = check_reindex(es, responses[old_index], old_index, new_index)
+            if error:
+                errors.append(f"{old_index}: {error}")
+                es.indices.delete(index=new_index)
+                continue
+
+            add = {"alias": alias, "index": new_index}
+            if old_index in write_indices:
+                add["is_write_index"] = True
+            es.indices.update_aliases(actions=[{"add": add}, {"remove": {"alias": alias, "index": old_index}}])
             es.indices.delete(index=old_index)
 
+        if errors:
+            for error in errors:
+                click.echo(error, err=True)
+            message = f"{len(errors)} indices failed to reindex"
+            raise click.ClickException(message)
+
+
+def check_reindex(es, response, old_index, new_index):
+    """Return an error message if the reindex task failed or if the indices' numbers of documents differ."""
+    if "type" in response:  # the task's error
+        return response.get("reason")
+    if response.get("failures"):
+        return f"{len(response['failures'])} documents failed to reindex: {response['failures'][0]}"
+
+    es.indices.refresh(index=new_index)
+    old_count = es.count(index=old_index)["count"]
+    new_count = es.count(index=new_index)["count"]
+    if old_count != new_count:
+        return f"{old_index} has {old_count} documents, but {new_index} has {new_count}"
+
+    return None
+
 
 @main.command()
 @click.argument("host")
 @click.argument("source")
 @click.argument("destination")
-def copy(host, source, destination):
+@click.option(
+    "--server-side",
+    is_flag=True,
+    help="copy the documents within Elasticsearch, using the reindex API, instead of via this client",
+)
+@bulk_options
+@connection_options
+@stats_option
+def copy(host, source, destination, server_side, connection, stats, **kwargs):
     """Add a document with a DESTINATION base URL for each document with a SOURCE base URL."""
-    with connect(host) as es:
-        body = []
+    with connect(host, **connection) as es:
+        if server_side:
+            copy_server_side(es, source, destination, stats=stats)
+        else:
+            actions = copy_actions(es, source, destination, stats=stats)
+            raise_for_failures(bulk(es, actions, stats=stats, **kwargs))
 
-        for result in es.cat.indices(format="json"):
-            index = result["index"]
-            for hit in es.search(index=index, size=10000, query={"term": {"base_url": source}})["hits"]["hits"]:
-                document = hit["_source"]
-                for field in ("url", "base_url"):
-                    document[field] = document[field].replace(source, destination)
 
-                body.append({"index": {"_index": index, "_id": document["url"]}})
-                body.append(document)
+def copy_server_side(es, source, destination, *, stats=None):
+    """
+    For each index behind an ``ocdsindex_XX`` alias, copy the documents matching the source base URL to a staging
+    index, changing them with :data:`COPY_SCRIPT`, then copy them back and delete the staging index.
+
+    Elasticsearch can't reindex an index into itself. A copied document that isn't deduplicated has a new ID, and is
+    added. A deduplicated document has the same ID, and is replaced.
+    """
+    stats = stats or NULL
 
-        es.bulk(operations=body)
+    for result in es.cat.aliases(format="json"):
+        if not result["alias"].startswith("ocdsindex_"):
+            continue
+
+        index = result["index"]
+        staging = f"{index}-copy"
+        with stats.timer("create_index"):
+            create_index(es, staging)
+        try:
+            with stats.timer("reindex"):
+                response = reindex_documents(
+                    es,
+                    index,
+                    staging,
+                    query={"term": {"base_url": source}},
+                    script={
+                        "lang": "painless",
+                        "source": COPY_SCRIPT,
+                        "params": {"source": source, "destination": destination},
+                    },
+                )
+            stats.add_took("reindex", response)
+            es.indices.refresh(index=staging)
+            with stats.timer("reindex"):
+                response = reindex_documents(es, staging, index)
+            stats.add_took("reindex", response)
+            stats.increment("created", response.get("created", 0))
+        finally:
+            es.indices.delete(index=staging, ignore_unavailable=True)
+
+
+def copy_actions(es, source, destination, *, stats=None):
+    for alias in get_aliases(es):
+        for hit in search_after(es, alias, {"term": {"base_url": source}}, stats=stats):
+            document = hit["_source"]
+            if isinstance(document["base_url"], list):  # a deduplicated document
+                for url in document["url"]:
+                    if url.startswith(source):
+                        copied = {**document, "base_url": destination, "url": url.replace(source, destination)}
+                        yield deduplicated_action(hit["_index"], copied, exists=True)
+                continue
+
+            for field in ("url", "base_url"):
+                document[field] = document[field].replace(source, destination)
+
+            yield {"_index": hit["_index"], "_id": document["url"], "_source": document}
+
+
+def validate_days(_ctx, _param, value):
+    # Unchanged documents aren't re-indexed by index --incremental, watch or index --manifest, and their timestamps are
+    # updated only once more than REFRESH_AFTER seconds old, so a shorter age would delete current documents.
+    if value * 86400 <= REFRESH_AFTER:
+        message = (
+            f"{value} is not more than {REFRESH_AFTER // 86400}, the number of days after which the timestamps of "
+            "unchanged documents are updated"
+        )
+        raise click.BadParameter(message)
+    return value
 
 
 @main.command()
@@ -178,27 +1456,301 @@ def copy(host, source, destination):
 @click.option(
     "--exclude-file", type=click.File(), help="exclude any document whose base URL is equal to a line in this file"
 )
-def expire(host, exclude_file):
-    """Delete documents from Elasticsearch indices that were crawled more than 180 days ago."""
-    threshold = int(time.time()) - 15552000  # 180 days
+@click.option(
+    "--days",
+    type=int,
+    default=180,
+    callback=validate_days,
+    help=f"delete documents that were crawled more than this many days ago (more than {REFRESH_AFTER // 86400})",
+)
+@click.option(
+    "--requests-per-second",
+    type=click.FloatRange(min=0, min_open=True),
+    help="throttle the deletion to this many documents per second",
+)
+@click.option("--dry-run", is_flag=True, help="print the number of documents to delete, without deleting them")
+@connection_options
+@stats_option
+def expire(host, exclude_file, days, requests_per_second, dry_run, connection, stats):
+    """
+    Delete documents from Elasticsearch indices that were crawled more than 180 days ago, or --days days ago.
+
+    Monthly indices, in which no documents are recent, are deleted whole, after moving any excluded documents to the
+    monthly index for the current month. Other documents are deleted from all ``ocdsindex_XX`` aliases at once, as an
+    Elasticsearch task, and its progress is printed.
+    """
+    stats = stats or NULL
+    threshold = int(time.time()) - days * 86400
 
     base_urls = [line.strip() for line in exclude_file] if exclude_file else []
 
-    with connect(host) as es:
-        for result in es.cat.indices(format="json"):
-            es.delete_by_query(
-                index=result["index"],
-                query={
-                    "bool": {
-                        "must": {
-                            "range": {"created_at": {"lt": threshold}},
-                        },
-                        "must_not": {
-                            "terms": {"base_url": base_urls},
-                        },
-                    }
+    with connect(host, **connection) as es:
+        aliases = get_aliases(es)
+        if not aliases:
+            return
+
+        index = ",".join(aliases)
+        query = {
+            "bool": {
+                "must": {
+                    "range": {"created_at": {"lt": threshold}},
                 },
+                "must_not": {
+                    "terms": {"base_url": base_urls},
+                },
+            }
+        }
+
+        if dry_run:
+            with stats.timer("count"):
+                count = es.count(index=index, query=query)["count"]
+            click.echo(count)
+            return
+
+        with stats.timer("delete_monthly_indices"):
+            for alias in aliases:
+                delete_monthly_indices(es, alias, threshold, base_urls)
+
+        # https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-delete-by-query.html#docs-delete-by-query-slice
+        with stats.timer("delete_by_query"):
+            task = es.delete_by_query(
+                index=index,
+                query=query,
+                conflicts="proceed",
+                slices="auto",
+                requests_per_second=requests_per_second,
+                wait_for_completion=False,
+            )["task"]
+            response = wait_for_tasks(es, {"expire": task})["expire"]
+        stats.add_took("delete_by_query", response)
+        stats.increment("deleted", response.get("deleted", 0))
+
+    if "type" in response:  # the task's error
+        message = f"The documents failed to delete: {response.get('reason')}"
+        raise click.ClickException(message)
+    if response.get("failures"):
+        for failure in response["failures"]:
+            click.echo(f"{failure.get('id')}: {failure.get('status')} {failure.get('cause')}", err=True)
+        message = f"{len(response['failures'])} documents failed to delete"
+        raise click.ClickException(message)
+
+
+def delete_monthly_indices(es, alias, threshold, base_urls):
+    """
+    Delete the monthly indices behind the alias in which no documents are more recent than the threshold, except for
+    documents with excluded base URLs, which are first moved to the monthly index for the current month.
+
+    :param es: an Elasticsearch client
+    :param str alias: an ``ocdsindex_XX`` alias
+    :param int threshold: the timestamp before which documents are expired
+    :param list base_urls: the base URLs of documents to keep
+    """
+    recent = {
+        "bool": {
+            "must": {"range": {"created_at": {"gte": threshold}}},
+            "must_not": {"terms": {"base_url": base_urls}},
+        }
+    }
+    excluded = {"terms": {"base_url": base_urls}}
+    current = None
+    deleted = False
+
+    for index in sorted(es.indices.get_alias(name=alias)):
+        if not parse_index(alias, index)[1] or es.count(index=index, query=recent)["count"]:
+            continue
+
+        if base_urls and es.count(index=index, query=excluded)["count"]:
+            if current is None:
+                current = get_monthly_index(es, alias, int(time.time()))
+            if index == current:
+                continue
+
+            # https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-reindex.html
+            response = es.options(request_timeout=3600).reindex(
+                source={"index": index, "query": excluded}, dest={"index": current}, slices="auto"
             )
+            if response["failures"]:
+                for failure in response["failures"]:
+                    click.echo(f"{failure.get('id')}: {failure.get('status')} {failure.get('cause')}", err=True)
+                message = f"{len(response['failures'])} documents failed to move from {index} to {current}"
+                raise click.ClickException(message)
+
+        es.indices.delete(index=index)
+        click.echo(f"{alias}: deleted {index}", err=True)
+        deleted = True
+
+    # The write index might have been deleted.
+    if deleted and es.indices.exists_alias(name=alias):
+        set_write_index(es, alias, list(es.indices.get_alias(name=alias)))
+
+
+@main.command()
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.argument("base-url")
+@click.argument("host")
+@click.option(
+    "--debounce",
+    type=click.FloatRange(min=0),
+    default=1.0,
+    help="the number of seconds without changes, after which to index the changes",
+)
+@click.option("--poll", is_flag=True, help="poll the directory for changes, instead of using inotify")
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=0, min_open=True),
+    default=1.0,
+    help="the number of seconds between polls",
+)
+@extractor_option
+@bulk_options
+@connection_options
+@stats_option
+def watch(directory, base_url, host, debounce, poll, interval, extractor, connection, stats, **kwargs):
+    """
+    Index the documents in the DIRECTORY of the Sphinx build of the OCDS documentation, with unique URLs from the
+    BASE_URL, in Elasticsearch at HOST. Then, watch the directory, and, once a build stops changing files, index the
+    documents in changed files and delete the documents in deleted files.
+
+    Like ``index --incremental``, only new and changed documents are indexed, and only removed documents are deleted.
+
+    The directory is watched with inotify on Linux, and polled otherwise, or with --poll. Stop with Ctrl-C.
+    """
+    from ocdsindex.crawler import Crawler
+    from ocdsindex.watch import Watcher
+
+    crawler = Crawler.from_extractor(directory, base_url, extractor, stats=stats)
+
+    with (
+        connect(host, **connection) as es,
+        Watcher(crawler, debounce=debounce, poll=poll, interval=interval) as watcher,
+    ):
+        created_at = int(time.time())
+        pages, failures = index_directory(es, crawler, created_at, stats=stats, **kwargs)
+        echo_failures(failures)
+        click.echo(f"indexed files: {len(pages)}, watching for changes", err=True)
+
+        refreshed_at = created_at
+        # Yield no changes periodically, so that timestamps are updated even if no files change.
+        for changed, deleted in watcher.get_changes(timeout=WATCH_TIMEOUT):
+            created_at = int(time.time())
+            if changed or deleted:
+                actions = change_actions(es, crawler, pages, changed, deleted, created_at, stats=stats)
+                failures = bulk(es, actions, stats=stats, **kwargs)
+                forget_failures(pages, failures)
+                echo_failures(failures)
+                click.echo(f"changed files: {len(changed)}, deleted files: {len(deleted)}", err=True)
+
+            # Unchanged documents aren't re-indexed, so update their timestamps, like index --incremental.
+            if created_at - refreshed_at >= REFRESH_AFTER:
+                for language_code in {language_code for language_code, _ in pages.values()}:
+                    refresh_created_at(es, f"ocdsindex_{language_code}", base_url, created_at)
+                refreshed_at = created_at
+
+
+def index_directory(es, crawler, created_at, *, stats=None, **kwargs):
+    """
+    Index the documents in the crawler's directory, like ``index --incremental``.
+
+    :param es: an Elasticsearch client
+    :param crawler: a :class:`~ocdsindex.crawler.Crawler`
+    :param int created_at: the timestamp of the documents
+    :param stats: a :class:`~ocdsindex.stats.Stats` in which to record timings and counters
+    :param kwargs: keyword arguments to :func:`bulk`
+    :returns: a dict in which the key is a file path and the value is the file's language code and the hash and index
+              of each document from the file, keyed by URL; and the failed actions' response items
+    :rtype: tuple
+    """
+    header = {"base_url": crawler.base_url, "created_at": created_at}
+    pages = {}
+    indices = {}
+
+    def groups():
+        for language_code, path, documents in crawler.get_documents_by_path():
+            yield language_code, documents
+            # index_actions() has set the hash and index of each document.
+            pages[path] = (
+                language_code,
+                {document["url"]: (document["hash"], indices[document["url"]]) for document in documents},
+            )
+
+    actions = index_actions(es, header, groups(), incremental=True, indices=indices, stats=stats)
+    failures = bulk(es, actions, stats=stats, **kwargs)
+    forget_failures(pages, failures)
+    return pages, failures
+
+
+def change_actions(es, crawler, pages, changed, deleted, created_at, *, stats=None):
+    """
+    Yield the bulk actions to delete the documents in the deleted files, and to index the new and changed documents
+    and delete the removed documents in the changed files.
+
+    :param es: an Elasticsearch client
+    :param crawler: a :class:`~ocdsindex.crawler.Crawler`
+    :param dict pages: the first return value of :func:`index_directory`, which is updated
+    :param dict changed: a dict in which the key is a changed file's path and the value is its language code
+    :param list deleted: the deleted files' paths
+    :param int created_at: the timestamp of the documents
+    :param stats: a :class:`~ocdsindex.stats.Stats` in which to record timings and counters
+    """
+    stats = stats or NULL
+    # The index to which to write new documents, for each alias.
+    targets = {}
+
+    # Changed and removed documents are updated and deleted in their existing indices, which, behind a monthly alias,
+    # might not be the write index.
+    for path in deleted:
+        _, hashes = pages.pop(path, (None, {}))
+        for url, (_, index) in hashes.items():
+            stats.increment("delete")
+            yield {"_op_type": "delete", "_index": index, "_id": url}
+
+    for path, language_code in changed.items():
+        try:
+            documents = crawler.get_documents_from_file(path)
+        except FileNotFoundError:  # deleted since the directory was scanned
+            documents = []
+        except MissingHeadingError:  # the error is logged
+            continue
+
+        alias = f"ocdsindex_{language_code}"
+        if alias not in targets:
+            check_not_deduplicated(es, alias)
+            with stats.timer("create_index"):
+                if not es.indices.exists(index=alias):
+                    create_index(es, f"{alias}-0001", alias=alias)
+                targets[alias] = get_write_index(es, alias)
+
+        _, hashes = pages.get(path, (language_code, {}))
+        new_hashes = {}
+        for document in documents:
+            document["base_url"] = crawler.base_url
+            document["created_at"] = created_at
+            document["hash"] = hash_document(document)
+
+            hash_, index = hashes.pop(document["url"], (None, targets[alias]))
+            new_hashes[document["url"]] = (document["hash"], index)
+            if hash_ != document["hash"]:
+                stats.increment("index")
+                yield {"_index": index, "_id": document["url"], "_source": document}
+            else:
+                stats.increment("unchanged")
+
+        # Any remaining documents are no longer present.
+        for url, (_, index) in hashes.items():
+            stats.increment("delete")
+            yield {"_op_type": "delete", "_index": index, "_id": url}
+
+        pages[path] = (language_code, new_hashes)
+        stats.add_documents(language_code, len(documents))
+
+
+def forget_failures(pages, failures):
+    """Forget the hashes of the documents that failed to index, so that they are indexed when their files change."""
+    ids = {result.get("_id") for item in failures for result in item.values()}
+    if ids:
+        for _, hashes in pages.values():
+            for url in ids & hashes.keys():
+                hashes[url] = (None, hashes[url][1])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from importlib.metadata import version
+
+
+def _digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class Cache:
+    """
+    Cache the documents to index from each file, in a SQLite database.
+
+    An entry is valid if the file's modification time and size are unchanged or, if not, if the file's SHA-256 digest
+    is unchanged. (Sphinx rewrites all files on a full build, even if their content is unchanged.) All entries are
+    invalid if the version of this package is changed.
+
+    Each change is committed immediately, in write-ahead log mode, so that other processes can use the cache at the
+    same time.
+    """
+
+    def __init__(self, directory, *, max_size=1073741824):
+        """
+        :param str directory: the directory in which to store the cache
+        :param int max_size: the maximum total size of the cached documents in bytes, after which the least recently
+                             used entries are deleted when the cache is closed
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        self.max_size = max_size
+        # Autocommit mode. https://docs.python.org/3/library/sqlite3.html#transaction-control
+        self.connection = sqlite3.connect(os.path.join(directory, "cache.sqlite3"), isolation_level=None)
+        self.connection.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                mtime_ns INTEGER,
+                size INTEGER,
+                digest TEXT,
+                documents TEXT,
+                accessed INTEGER
+            );
+            """
+        )
+
+        current = version("ocdsindex")
+        row = self.connection.execute("SELECT value FROM metadata WHERE key = 'version'").fetchone()
+        if row is None or row[0] != current:
+            with self.connection:
+                self.connection.execute("BEGIN")
+                self.connection.execute("DELETE FROM entries")
+                self.connection.execute("INSERT OR REPLACE INTO metadata VALUES ('version', ?)", (current,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get(self, key, path):
+        """
+        Return the cached documents to index from the file, or ``None`` if there is no valid entry.
+
+        :param str key: the entry's key
+        :param str path: a file path
+        :rtype: list
+        """
+        if not self.has(key, path):
+            return None
+        return self.load(key)
+
+    def has(self, key, path):
+        """
+        Return whether there is a valid entry for the file, without reading the cached documents.
+
+        :param str key: the entry's key
+        :param str path: a file path
+        :rtype: bool
+        """
+        row = self.connection.execute("SELECT mtime_ns, size, digest FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False
+
+        mtime_ns, size, digest = row
+        stat = os.stat(path)
+        if stat.st_size != size:
+            return False
+        if stat.st_mtime_ns != mtime_ns:
+            if _digest(path) != digest:
+                return False
+            self.connection.execute("UPDATE entries SET mtime_ns = ? WHERE key = ?", (stat.st_mtime_ns, key))
+
+        self.connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time_ns(), key))
+        return True
+
+    def load(self, key):
+        """
+        Return the cached documents of an entry, or ``None`` if there is no entry, for example, if another process
+        deleted it after :meth:`has` returned ``True``.
+
+        :param str key: the entry's key
+        :rtype: list
+        """
+        row = self.connection.execute("SELECT documents FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, path, documents):
+        """
+        Cache the documents to index from the file.
+
+        :param str key: the entry's key
+        :param str path: a file path
+        :param list documents: the documents to index
+        """
+        stat = os.stat(path)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+            (key, stat.st_mtime_ns, stat.st_size, _digest(path), json.dumps(documents), time.time_ns()),
+        )
+
+    def prune(self):
+        """Delete the least recently used entries, until the total size of the cached documents is within the limit."""
+        total = 0
+        stale = []
+        for key, size in self.connection.execute("SELECT key, length(documents) FROM entries ORDER BY accessed DESC"):
+            total += size
+            if total > self.max_size:
+                stale.append((key,))
+        with self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def close(self):
+        """Delete the least recently used entries, if needed, and close the cache."""
+        self.prune()
+        self.connection.close()
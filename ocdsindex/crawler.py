@@ -1,10 +1,17 @@
+import hashlib
 import os
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from importlib.metadata import version
 from operator import attrgetter
 from urllib.parse import urljoin
 
 import lxml.html
 
+from ocdsindex.stats import NULL
+
 
 def true(_root, _file):
     return True
@@ -13,7 +20,19 @@ def true(_root, _file):
 class Crawler:
     """Crawl a directory for documents to index."""
 
-    def __init__(self, directory, base_url, extract, *, allow=true):
+    def __init__(
+        self,
+        directory,
+        base_url,
+        extract,
+        *,
+        allow=true,
+        workers=1,
+        cache=None,
+        streaming=False,
+        languages=None,
+        stats=None,
+    ):
         """
         :param str directory: the directory to crawl
         :param str base_url: the remote URL at which the files will be available
@@ -21,11 +40,41 @@ class Crawler:
                         documents to index as a list of dicts
         :param allow: a function that accepts a directory path and a file basename, and returns whether to crawl the
                       file as a boolean
+        :param int workers: the number of processes with which to parse files (``extract`` and ``allow`` must be
+                            picklable, like module-level functions, if greater than 1)
+        :param cache: a :class:`~ocdsindex.cache.Cache` of the documents to index from each file
+        :param bool streaming: whether ``extract`` accepts a file's path instead of its root HTML element, in order to
+                               parse the file incrementally, like :func:`~ocdsindex.extract.extract_sphinx_file`
+        :param languages: the language codes of the directories to crawl, or ``None`` to crawl all directories
+        :param stats: a :class:`~ocdsindex.stats.Stats` in which to record timings and counters
         """
         self.directory = directory
         self.base_url = base_url
         self.extract = extract
         self.allow = allow
+        self.workers = workers
+        self.cache = cache
+        self.streaming = streaming
+        self.languages = languages
+        self.stats = stats or NULL
+
+    def __getstate__(self):
+        # Worker processes use neither the cache nor the stats, which can't be pickled.
+        return {**self.__dict__, "cache": None, "stats": NULL}
+
+    @classmethod
+    def from_extractor(cls, directory, base_url, extractor, **kwargs):
+        """
+        Return a crawler that uses the extractor's ``extract`` and ``allow`` methods.
+
+        :param str directory: the directory to crawl
+        :param str base_url: the remote URL at which the files will be available
+        :param extractor: an :class:`~ocdsindex.extractors.Extractor`
+        :param kwargs: keyword arguments to pass to the constructor
+        """
+        return cls(
+            directory, base_url, extractor.extract, allow=extractor.allow, streaming=extractor.streaming, **kwargs
+        )
 
     def get_documents_by_language(self):
         """
@@ -36,35 +85,192 @@ class Crawler:
         """
         documents = defaultdict(list)
 
+        for language_code, results in self.get_documents_by_file():
+            documents[language_code].extend(results)
+
+        return documents
+
+    def get_documents(self):
+        """
+        Yield the documents to index, one at a time, in the same order as :meth:`get_documents_by_language`.
+
+        :returns: pairs of a language code and a document to index
+        :rtype: generator
+        """
+        for language_code, results in self.get_documents_by_file():
+            for document in results:
+                yield language_code, document
+
+    def get_documents_by_file(self):
+        """
+        Yield the documents to index from each file.
+
+        :returns: pairs of a language code and the documents to index from a file
+        :rtype: generator
+        """
+        for language_code, _, documents in self.get_documents_by_path():
+            yield language_code, documents
+
+    def get_documents_by_path(self):
+        """
+        Yield the documents to index from each file, with the file's path.
+
+        :returns: triples of a language code, a file path and the documents to index from the file
+        :rtype: generator
+        """
+        with self.stats.timer("crawl"):
+            paths_by_language = self.get_paths_by_language()
+
+        # The cached documents are loaded as they are yielded, so that they aren't all in memory at once.
+        entries = []
+        for language_code, paths in paths_by_language.items():
+            for path in paths:
+                if self.cache is None or not path.endswith(".html"):  # no documents to cache
+                    cached = False
+                else:
+                    with self.stats.timer("cache"):
+                        cached = self.cache.has(self.get_cache_key(path), path)
+                    self.stats.increment("cache_hits" if cached else "cache_misses")
+                entries.append((language_code, path, cached))
+
+        misses = [path for _, path, cached in entries if not cached]
+
+        with ExitStack() as stack:
+            if self.workers > 1 and misses:
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=self.workers))
+                chunksize = max(1, len(misses) // (self.workers * 4))
+                # map() yields results in the order of its input, so the output is the same as without workers.
+                results = executor.map(self._get_documents_from_file, misses, chunksize=chunksize)
+            else:
+                results = map(self._get_documents_from_file, misses)
+
+            for language_code, path, cached in entries:
+                documents = None
+                if cached:
+                    # None if another process deleted the entry since it was checked.
+                    with self.stats.timer("cache"):
+                        documents = self.cache.load(self.get_cache_key(path))
+
+                if documents is None:
+                    result = self._get_documents_from_file(path) if cached else next(results)
+                    documents, parse_seconds, extract_seconds = result
+                    self.stats.add_time("parse", parse_seconds)
+                    self.stats.add_time("extract", extract_seconds)
+                    self.stats.add_file(path, parse_seconds + extract_seconds)
+                    if self.cache is not None and path.endswith(".html"):
+                        with self.stats.timer("cache"):
+                            self.cache.set(self.get_cache_key(path), path, documents)
+
+                self.stats.increment("files")
+                self.stats.add_documents(language_code, len(documents))
+                yield language_code, path, documents
+
+    def get_paths_by_language(self):
+        """
+        Return the paths of the files to crawl for each language.
+
+        :returns: a dict in which the key is a language code and the value is the file paths to crawl
+        :rtype: dict
+        """
+        paths = defaultdict(list)
+
         # The entries are sorted to make it easier to manually test whether output has changed.
         for entry in sorted(os.scandir(self.directory), key=attrgetter("name")):
             if not entry.is_dir() or len(entry.name) != 2:  # not an ISO 639-1 language code directory
                 continue
+            if self.languages is not None and entry.name not in self.languages:
+                continue
 
             for root, _, files in os.walk(entry.path):
                 for file in files:
                     if self.allow(root, file):
-                        documents[entry.name].extend(self.get_documents_from_file(os.path.join(root, file)))
+                        paths[entry.name].append(os.path.join(root, file))
 
-        return documents
+        return paths
+
+    def get_fingerprints(self, *, content=False):
+        """
+        Return a fingerprint of the files to crawl in each language, which changes if a file is added, removed or
+        changed, so that a language whose fingerprint is unchanged needn't be crawled again.
+
+        A file is changed if its modification time or size is changed or, with ``content``, if its SHA-256 digest is
+        changed. The fingerprints also change if the base URL, the ``extract`` function or this package's version is
+        changed.
+
+        :param bool content: whether to read the files' contents, instead of their modification times and sizes, which
+                             change whenever Sphinx rewrites a file, even if its content is unchanged
+        :returns: a dict in which the key is a language code and the value is a fingerprint
+        :rtype: dict
+        """
+        prefix = f"{version('ocdsindex')} {self.base_url} {self.extract.__module__}.{self.extract.__qualname__}\n"
+
+        fingerprints = {}
+        for language_code, paths in self.get_paths_by_language().items():
+            # Hash the hash of each file, in a consistent order.
+            digest = hashlib.sha256(prefix.encode())
+            for path in sorted(paths):
+                if content:
+                    with open(path, "rb") as f:
+                        value = hashlib.sha256(f.read()).hexdigest()
+                else:
+                    stat = os.stat(path)
+                    value = f"{stat.st_mtime_ns} {stat.st_size}"
+                relative_path = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                digest.update(f"{relative_path} {value}\n".encode())
+            fingerprints[language_code] = digest.hexdigest()
+
+        return fingerprints
+
+    def get_cache_key(self, path):
+        """
+        Return the key of the file's entry in the cache, which depends on its remote URL and the ``extract`` function.
+
+        :param str path: a file path
+        :rtype: str
+        """
+        return f"{self.get_url(path)} {self.extract.__module__}.{self.extract.__qualname__}"
+
+    def get_url(self, path):
+        """
+        Calculate the file's remote URL.
+
+        :param str path: a file path
+        :rtype: str
+        """
+        url = urljoin(self.base_url, os.path.relpath(path, self.directory).replace(os.sep, "/"))
+        if url.endswith("/index.html"):
+            url = url[:-10]
+        return url
 
     def get_documents_from_file(self, path):
         """
         Parse the file's HTML contents, calculate its remote URL, and return the documents to index from the file.
 
+        If ``streaming`` is set, pass the file's path to ``extract``, instead of parsing the file.
+
         :param str path: a file path
         :returns: the documents to index
         :rtype: list
         """
+        return self._get_documents_from_file(path)[0]
+
+    def _get_documents_from_file(self, path):
+        # Return the documents to index from the file, and the time spent parsing and extracting, as measured in the
+        # process that parses the file. A streaming extractor's time is all extracting.
         if not path.endswith(".html"):
-            return []
+            return [], 0.0, 0.0
+
+        start = time.perf_counter()
+
+        if self.streaming:
+            documents = self.extract(self.get_url(path), path)
+            return documents, 0.0, time.perf_counter() - start
 
         with open(path) as f:
             content = f.read()
 
-        url = urljoin(self.base_url, os.path.relpath(path, self.directory).replace(os.sep, "/"))
-        if url.endswith("/index.html"):
-            url = url[:-10]
         tree = lxml.html.fromstring(content)
+        parsed = time.perf_counter()
 
-        return self.extract(url, tree)
+        documents = self.extract(self.get_url(path), tree)
+        return documents, parsed - start, time.perf_counter() - parsed
@@ -4,3 +4,15 @@ class OCDSIndexError(Exception):
 
 class MissingHeadingError(OCDSIndexError, IndexError):
     """Raised when a section is missing a heading."""
+
+
+class UnknownExtractorError(OCDSIndexError, KeyError):
+    """Raised when no extractor has the given name."""
+
+
+class InvalidExtractorError(OCDSIndexError, TypeError):
+    """Raised when an entry point's object is not an extractor."""
+
+
+class MissingDependencyError(OCDSIndexError, ImportError):
+    """Raised when an optional dependency is needed but not installed."""
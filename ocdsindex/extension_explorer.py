@@ -0,0 +1,185 @@
+"""Read the Extension Explorer's ``extensions.json`` file, one extension at a time, and extract documents to index."""
+
+import itertools
+import json
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from ocdsindex.extract import extract_extension_explorer
+from ocdsindex.stats import NULL
+
+BASE_URL = "https://extensions.open-contracting.org/"
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+_delimiters = ",:]}"
+
+
+class _Reader:
+    # A buffer over a text file, from which JSON values are decoded as they are read.
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def read(self):
+        # Discard the consumed text, and read at least as much text as is buffered, so that re-decoding a large value
+        # takes linear time.
+        self.buffer = self.buffer[self.position :]
+        self.position = 0
+        chunk = self.file.read(max(self.chunk_size, len(self.buffer)))
+        if not chunk:
+            self.eof = True
+        self.buffer += chunk
+
+    def peek(self):
+        # Return the next non-whitespace character, or "" at the end of the file.
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in _whitespace:
+                self.position += 1
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position : self.position + 1]
+            self.read()
+
+    def expect(self, characters):
+        character = self.peek()
+        if not character or character not in characters:
+            message = f"Expecting one of {characters!r}"
+            raise json.JSONDecodeError(message, self.buffer, self.position)
+        self.position += 1
+        return character
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A number might continue in the next chunk, like "1." or "1e", so a value is complete only if it's
+                # followed by a delimiter.
+                following = end
+                while following < len(self.buffer) and self.buffer[following] in _whitespace:
+                    following += 1
+                if self.eof or (following < len(self.buffer) and self.buffer[following] in _delimiters):
+                    self.position = end
+                    return value
+            self.read()
+
+
+def iterload(file, chunk_size=65536):
+    """
+    Yield the key-value pairs of the top-level JSON object in the file, decoding one value at a time, so that the
+    file isn't read into memory all at once.
+
+    :param file: a text file
+    :param int chunk_size: the number of characters to read at a time
+    :returns: pairs of a key and a value
+    :rtype: generator
+    """
+    reader = _Reader(file, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.decode()
+        reader.expect(":")
+        yield key, reader.decode()
+        if reader.expect(",}") == "}":
+            return
+
+
+def get_documents_from_extension(item):
+    """
+    Return the documents to index from each version's README in each language of an extension.
+
+    :param tuple item: a pair of an extension's identifier and its data from the ``extensions.json`` file
+    :returns: pairs of a language code and the documents to index
+    :rtype: list
+    """
+    extension_id, extension = item
+    names = extension.get("name") or {}
+
+    results = []
+    for version_id, version in extension.get("versions", {}).items():
+        for language_code, readme in (version.get("readme") or {}).items():
+            url = f"{BASE_URL}{language_code}/extensions/{extension_id}/{version_id}/"
+            page_title = names.get(language_code) or extension_id
+            results.append((language_code, extract_extension_explorer(url, readme, page_title)))
+    return results
+
+
+class ExtensionExplorer:
+    """Read the Extension Explorer's ``extensions.json`` file for documents to index."""
+
+    def __init__(self, file, *, workers=1, stats=None):
+        """
+        :param file: the ``extensions.json`` file, as a text file
+        :param int workers: the number of processes with which to extract documents
+        :param stats: a :class:`~ocdsindex.stats.Stats` in which to record timings and counters
+        """
+        self.file = file
+        self.workers = workers
+        self.stats = stats or NULL
+
+    def get_documents_by_language(self):
+        """
+        Return the documents to index for each language.
+
+        :returns: a dict in which the key is a language code and the value is the documents to index
+        :rtype: dict
+        """
+        documents = defaultdict(list)
+
+        for language_code, results in self.get_documents_by_extension():
+            documents[language_code].extend(results)
+
+        return documents
+
+    def get_documents(self):
+        """
+        Yield the documents to index, one at a time, extension by extension.
+
+        :returns: pairs of a language code and a document to index
+        :rtype: generator
+        """
+        for language_code, results in self.get_documents_by_extension():
+            for document in results:
+                yield language_code, document
+
+    def get_documents_by_extension(self):
+        """
+        Yield the documents to index from each version's README in each language, extension by extension.
+
+        If ``workers`` is greater than 1, extensions are read in batches, and the documents are extracted in parallel.
+
+        :returns: pairs of a language code and the documents to index
+        :rtype: generator
+        """
+        items = iterload(self.file)
+
+        if self.workers == 1:
+            for item in items:
+                with self.stats.timer("extract"):
+                    results = get_documents_from_extension(item)
+                yield from self._record(results)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # Read a bounded number of extensions at a time, instead of submitting all extensions at once.
+            while batch := list(itertools.islice(items, self.workers * 4)):
+                with self.stats.timer("extract"):
+                    batch_results = list(executor.map(get_documents_from_extension, batch))
+                for results in batch_results:
+                    yield from self._record(results)
+
+    def _record(self, results):
+        self.stats.increment("extensions")
+        for language_code, documents in results:
+            self.stats.add_documents(language_code, len(documents))
+        return results
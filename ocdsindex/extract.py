@@ -12,6 +12,7 @@ text
 """
 
 import logging
+import re
 
 import lxml.html
 from lxml import etree
@@ -21,18 +22,41 @@ from ocdsindex.exceptions import MissingHeadingError
 logger = logging.getLogger(__name__)
 
 
-def _extract_sphinx_section(section):
-    lines = []
+# The XPath expressions are compiled once, instead of once per page or per section.
+_title = etree.XPath("//title/text()")
+_sections = etree.XPath("//*[contains(@role, 'main')]//section")
+_headings = etree.XPath("h1|h2|h3|h4|h5|h6")
+_highlight_json = etree.XPath(
+    "//div[@class and contains(concat(' ', normalize-space(@class), ' '), ' highlight-json ')]"
+)
+
+_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_SKIP = {"section", *_HEADINGS}
+
+
+def _text_content(element):
+    return element.text_content()
+
+
+def _iter_sphinx_section_text(section, text_content=_text_content):
+    # Yield the text nodes and the text content of the child elements, like the XPath expression
+    # "node()[not(self::comment())]", without evaluating XPath.
+    if section.text:
+        yield section.text
 
-    for node in section.xpath("node()[not(self::comment())]"):
-        if isinstance(node, str):  # lxml.etree._ElementUnicodeResult
-            text = str(node)
+    for child in section:
         # Index each section separately. Don't index the title as part of the text.
-        elif node.tag in {"section", "h1", "h2", "h3", "h4", "h5", "h6"}:
-            continue
-        else:
-            text = node.text_content()
+        if isinstance(child.tag, str) and child.tag not in _SKIP:
+            yield text_content(child)
+        # Comments are skipped, but their tails are not.
+        if child.tail:
+            yield child.tail
+
 
+def _extract_sphinx_section(section, text_content=_text_content):
+    lines = []
+
+    for text in _iter_sphinx_section_text(section, text_content):
         # Normalize whitespace within a single line.
         lines.extend([" ".join(line.split()) for line in text.splitlines()])
 
@@ -40,10 +64,6 @@ def _extract_sphinx_section(section):
     return "\n".join(filter(None, lines)), section.attrib["id"]
 
 
-def _select_div_by_class(tree, class_name):
-    return tree.xpath(f"//div[@class and contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]")
-
-
 def extract_sphinx(url, tree):
     """
     Extract one document per section of the page.
@@ -54,22 +74,27 @@ def extract_sphinx(url, tree):
     :rtype: list
     """
     # Don't index the text content of script and style HTML elements.
-    for element in ("script", "style"):
-        etree.strip_elements(tree, element)
+    etree.strip_elements(tree, "script", "style")
 
     # Don't index the text content of code-block, literalinclude, jsoninclude, etc. directives.
-    for section in _select_div_by_class(tree, "highlight-json"):
+    for section in _highlight_json(tree):
         section.getparent().remove(section)
 
+    sections = _sections(tree)
+    if not sections:
+        return []
+
+    page_title = _title(tree)[0].split("—")[0].strip()
+
     documents = []
-    for section in tree.xpath("//*[contains(@role, 'main')]//section"):
-        title = tree.xpath("//title/text()")[0].split("—")[0].strip()
+    for section in sections:
         try:
-            section_title = section.xpath("h1|h2|h3|h4|h5|h6")[0].text_content().rstrip("¶")
+            section_title = _headings(section)[0].text_content().rstrip("¶")
         except IndexError as e:
             logger.exception("No heading found\n%s", lxml.html.tostring(section).decode())
             raise MissingHeadingError from e
 
+        title = page_title
         if title != section_title:
             title = f"{title} - {section_title}"
 
@@ -88,5 +113,213 @@ def extract_sphinx(url, tree):
     return documents
 
 
-def extract_extension_explorer(url, tree):
-    pass
+def _is_removed(element):
+    # The elements that extract_sphinx removes, with their tails.
+    return element.tag in {"script", "style"} or (
+        element.tag == "div" and "highlight-json" in (element.get("class") or "").split()
+    )
+
+
+def _iter_text(element):
+    # Yield the text nodes of the element, like text_content(), skipping the elements that extract_sphinx removes.
+    if element.text:
+        yield element.text
+
+    for child in element:
+        if _is_removed(child):
+            continue
+        if isinstance(child.tag, str):
+            yield from _iter_text(child)
+        if child.tail:
+            yield child.tail
+
+
+def _streaming_text_content(element):
+    return "".join(_iter_text(element))
+
+
+def extract_sphinx_file(url, path):
+    """
+    Extract one document per section of the page, like :func:`extract_sphinx`, but parse the file incrementally.
+
+    The file is read as bytes. Each section is processed when its end tag is parsed, and each element is cleared once
+    no open section needs its text, so that memory use is proportional to the largest section, instead of the page.
+
+    :param str url: the file's remote URL
+    :param str path: the file's path
+    :returns: a list of dicts representing the documents to index
+    :rtype: list
+    """
+    titles = []
+    # The open elements whose role contains "main", the open elements that extract_sphinx removes, and the open
+    # sections to index.
+    mains = []
+    removed = []
+    open_sections = []
+    # The sections' results, in the order of their start tags, like the XPath expression.
+    results = []
+    positions = {}
+
+    with open(path, "rb") as f:
+        for event, element in etree.iterparse(f, events=("start", "end"), html=True, encoding="utf-8"):
+            if event == "start":
+                if element.tag == "section" and mains and not removed:
+                    open_sections.append(element)
+                    positions[element] = len(results)
+                    results.append(None)
+                if "main" in (element.get("role") or ""):
+                    mains.append(element)
+                if _is_removed(element):
+                    removed.append(element)
+                continue
+
+            if mains and mains[-1] is element:
+                mains.pop()
+            if removed and removed[-1] is element:
+                removed.pop()
+                continue  # its parent is not yet closed, and _iter_text() skips it
+
+            if element.tag == "title" and not titles and not removed and element.text:
+                titles.append(element.text)
+
+            if open_sections and open_sections[-1] is element:
+                open_sections.pop()
+                try:
+                    heading = next(child for child in element if child.tag in _HEADINGS)
+                except StopIteration as e:
+                    logger.exception("No heading found\n%s", lxml.html.tostring(element).decode())
+                    raise MissingHeadingError from e
+                section_title = _streaming_text_content(heading).rstrip("¶")
+                # The children and their tails are parsed, so the elements that extract_sphinx removes can be removed.
+                for child in [child for child in element if _is_removed(child)]:
+                    element.remove(child)
+                results[positions.pop(element)] = (
+                    section_title,
+                    *_extract_sphinx_section(element, _streaming_text_content),
+                )
+
+            if not _is_needed(element, positions):
+                element.clear(keep_tail=True)
+
+    if not results:
+        return []
+
+    page_title = titles[0].split("—")[0].strip()
+
+    documents = []
+    for section_title, text, section_id in results:
+        title = page_title
+        if title != section_title:
+            title = f"{title} - {section_title}"
+
+        documents.append(
+            {
+                "url": f"{url}#{section_id}",
+                "title": title,
+                "text": text,
+            }
+        )
+
+    return documents
+
+
+def _is_needed(element, open_sections):
+    # Whether an open section includes the element's text, because the element isn't in a child section.
+    child = element
+    parent = element.getparent()
+    while parent is not None:
+        if parent in open_sections and child.tag != "section":
+            return True
+        child = parent
+        parent = parent.getparent()
+    return False
+
+
+# https://spec.commonmark.org/0.31.2/#atx-headings
+_markdown_heading = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))??(?:[ \t]+#+)?[ \t]*$")
+# https://spec.commonmark.org/0.31.2/#fenced-code-blocks
+_markdown_fence = re.compile(r"^ {0,3}(`{3,}|~{3,})[ \t]*([^`\s]*)")
+_markdown_link = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_markdown_tag = re.compile(r"<[^>]+>")
+_markdown_prefix = re.compile(r"^\s*(?:>\s*)*(?:[-*+]|\d+[.)])?\s+")
+_markdown_markup = re.compile(r"\*\*|__|[*`]")
+
+
+def _plain_markdown(line):
+    # Remove inline markup, keeping the text of links and images.
+    line = _markdown_link.sub(r"\1", line)
+    line = _markdown_tag.sub("", line)
+    line = _markdown_prefix.sub("", line)
+    return _markdown_markup.sub("", line)
+
+
+def _slugify(text, seen):
+    # Like GitHub, lowercase the text, remove punctuation, replace spaces with hyphens, and number duplicates.
+    slug = re.sub(r"[^\w\- ]", "", text.lower()).strip().replace(" ", "-")
+    count = seen.get(slug, 0)
+    seen[slug] = count + 1
+    if count:
+        return f"{slug}-{count}"
+    return slug
+
+
+def extract_extension_explorer(url, text, page_title):
+    """
+    Extract one document per section of an extension's README.
+
+    A section is the text between a heading and the next heading. Any text before the first heading is indexed with
+    the page's URL. Like :func:`extract_sphinx` with ``highlight-json`` blocks, JSON code blocks are not indexed.
+
+    :param str url: the remote URL of the extension's page
+    :param str text: the README, as Markdown
+    :param str page_title: the extension's name
+    :returns: a list of dicts representing the documents to index
+    :rtype: list
+    """
+    # Pairs of a section's heading (None for any text before the first heading) and its lines.
+    sections = [(None, [])]
+    fence = None
+    skip = False
+
+    for line in text.splitlines():
+        if fence:
+            if line.lstrip().startswith(fence):
+                fence = None
+            elif not skip:
+                sections[-1][1].append(line)
+            continue
+
+        if match := _markdown_fence.match(line):
+            fence = match.group(1)
+            skip = match.group(2).lower() == "json"
+            continue
+
+        if match := _markdown_heading.match(line):
+            sections.append((_plain_markdown(match.group(2) or "").strip(), []))
+        else:
+            sections[-1][1].append(_plain_markdown(line))
+
+    seen = {}
+    documents = []
+    for section_title, lines in sections:
+        # Normalize whitespace within a single line, and compact newlines.
+        text = "\n".join(filter(None, (" ".join(line.split()) for line in lines)))
+
+        if section_title is None:
+            if text:
+                documents.append({"url": url, "title": page_title, "text": text})
+            continue
+
+        title = page_title
+        if title != section_title:
+            title = f"{title} - {section_title}"
+
+        documents.append(
+            {
+                "url": f"{url}#{_slugify(section_title, seen)}",
+                "title": title,
+                "text": text,
+            }
+        )
+
+    return documents
@@ -0,0 +1,93 @@
+"""
+A registry of extractors, each of which pairs an ``extract_`` method with an ``allow_`` method for a kind of site.
+
+Other packages can register extractors under the ``ocdsindex.extractors`` entry point group, in which the name is the
+extractor's name and the object is an :class:`~ocdsindex.extractors.Extractor`. For example, in ``pyproject.toml``:
+
+.. code-block:: toml
+
+   [project.entry-points."ocdsindex.extractors"]
+   mysite = "mypackage.extract:extractor"
+
+An entry point with the same name as a built-in extractor is ignored. Any selectors should be compiled when the
+extractor's module is imported, not when a page is extracted.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+
+from ocdsindex.allow import allow_sphinx
+from ocdsindex.crawler import true
+from ocdsindex.exceptions import InvalidExtractorError, UnknownExtractorError
+from ocdsindex.extract import extract_sphinx, extract_sphinx_file
+
+ENTRY_POINT_GROUP = "ocdsindex.extractors"
+
+
+@dataclass(frozen=True)
+class Extractor:
+    """
+    An extractor of documents from a kind of site.
+
+    :param str name: the extractor's name
+    :param extract: a function that accepts a file's remote URL and its root HTML element (or its path, if
+                    ``streaming``), and returns the documents to index as a list of dicts
+    :param allow: a function that accepts a directory path and a file basename, and returns whether to crawl the file
+    :param bool streaming: whether ``extract`` accepts a file's path instead of its root HTML element
+    """
+
+    name: str
+    extract: Callable
+    allow: Callable = true
+    streaming: bool = False
+
+
+BUILTIN = {
+    extractor.name: extractor
+    for extractor in (
+        Extractor("sphinx", extract_sphinx, allow_sphinx),
+        Extractor("sphinx-streaming", extract_sphinx_file, allow_sphinx, streaming=True),
+    )
+}
+
+
+def get_extractors():
+    """
+    Return the built-in extractors and the extractors registered under the ``ocdsindex.extractors`` entry point group.
+
+    :returns: a dict in which the key is an extractor's name and the value is an :class:`Extractor`
+    :rtype: dict
+    :raises InvalidExtractorError: if an entry point's object is not an :class:`Extractor`
+    """
+    extractors = dict(BUILTIN)
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        if entry_point.name not in extractors:
+            extractors[entry_point.name] = _load(entry_point)
+    return extractors
+
+
+def get_extractor(name):
+    """
+    Return the extractor with the name.
+
+    :param str name: an extractor's name
+    :rtype: Extractor
+    :raises UnknownExtractorError: if no extractor has the name
+    :raises InvalidExtractorError: if the entry point's object is not an :class:`Extractor`
+    """
+    if name in BUILTIN:
+        return BUILTIN[name]
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP, name=name):
+        return _load(entry_point)
+
+    raise UnknownExtractorError(name)
+
+
+def _load(entry_point):
+    extractor = entry_point.load()
+    if not isinstance(extractor, Extractor):
+        message = f"the {entry_point.name!r} entry point is not an Extractor: {extractor!r}"
+        raise InvalidExtractorError(message)
+    return extractor
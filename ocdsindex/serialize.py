@@ -0,0 +1,195 @@
+"""
+Methods that write and read the documents to index.
+
+Two formats are supported:
+
+JSON
+  A single object with ``base_url``, ``created_at`` and ``documents`` keys, in which the ``documents`` key is an object
+  in which the key is a language code and the value is the documents to index.
+NDJSON
+  A header line with ``base_url`` and ``created_at`` keys, followed by one line per document to index, in which the
+  ``language`` key is the document's language code. Documents can be written and read one at a time.
+
+In either format, if the ``relative_urls`` key of the header is ``true``, the URL of each document that starts with the
+base URL is written without the base URL. The header can have other keys, like the ``fingerprints`` and ``unchanged``
+keys that the ``sphinx`` command writes with a manifest.
+
+Either format can be compressed with gzip or zstd. :func:`~ocdsindex.serialize.decompress` detects the compression
+from the file's first bytes. zstd requires Python 3.14 or the ``zstandard`` package.
+"""
+
+import gzip
+import io
+import itertools
+import json
+import re
+from contextlib import contextmanager
+from operator import itemgetter
+
+from ocdsindex.exceptions import MissingDependencyError
+from ocdsindex.stats import NULL
+
+try:
+    from compression import zstd  # Python 3.14
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+FORMATS = ("json", "ndjson")
+COMPRESSIONS = ("gzip", "zstd")
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_absolute_url = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*://")
+
+
+def _open_zstd(file, mode):
+    if zstd is None:
+        message = "zstd requires Python 3.14 or the zstandard package"
+        raise MissingDependencyError(message)
+    if hasattr(zstd, "ZstdFile"):
+        return zstd.ZstdFile(file, mode)
+    return zstd.open(file, mode, closefd=False)
+
+
+@contextmanager
+def compress(file, compression):
+    """
+    Yield a text file that writes to the binary file, compressing the text. The binary file isn't closed.
+
+    :param file: a binary file
+    :param str compression: either ``gzip`` or ``zstd``
+    """
+    # mtime=0 makes the output reproducible.
+    stream = gzip.GzipFile(fileobj=file, mode="wb", mtime=0) if compression == "gzip" else _open_zstd(file, "wb")
+
+    with io.TextIOWrapper(stream, encoding="utf-8") as text:
+        yield text
+
+
+def decompress(file):
+    """
+    Return a text file that reads the binary file, decompressing it if it is compressed with gzip or zstd.
+
+    :param file: a binary file that supports ``peek()``, like a file opened in ``rb`` mode
+    :rtype: io.TextIOWrapper
+    """
+    magic = file.peek(4)[:4]
+    if magic.startswith(_GZIP_MAGIC):
+        file = gzip.GzipFile(fileobj=file, mode="rb")
+    elif magic == _ZSTD_MAGIC:
+        file = _open_zstd(file, "rb")
+    return io.TextIOWrapper(file, encoding="utf-8")
+
+
+def _relative(document, base_url):
+    if document["url"].startswith(base_url):
+        return {**document, "url": document["url"][len(base_url) :]}
+    return document
+
+
+def _absolute(document, base_url):
+    if not _absolute_url.match(document["url"]):
+        document["url"] = base_url + document["url"]
+    return document
+
+
+def dump_json(file, base_url, created_at, documents, *, relative_urls=False, metadata=None, stats=None):
+    """
+    Write the documents to index as a JSON object.
+
+    :param file: a text file
+    :param str base_url: the remote URL at which the documents will be accessible
+    :param int created_at: the timestamp at which the files were crawled
+    :param dict documents: a dict in which the key is a language code and the value is the documents to index
+    :param bool relative_urls: whether to write URLs without the base URL
+    :param dict metadata: other keys to write in the header
+    :param stats: a :class:`~ocdsindex.stats.Stats` in which to record timings
+    """
+    with (stats or NULL).timer("serialize"):
+        header = {"base_url": base_url, "created_at": created_at, **(metadata or {})}
+        if relative_urls:
+            header["relative_urls"] = True
+            documents = {
+                language_code: [_relative(document, base_url) for document in values]
+                for language_code, values in documents.items()
+            }
+        json.dump({**header, "documents": documents}, file)
+
+
+def dump_ndjson(file, base_url, created_at, documents, *, relative_urls=False, metadata=None, stats=None):
+    """
+    Write the documents to index as newline-delimited JSON.
+
+    :param file: a text file
+    :param str base_url: the remote URL at which the documents will be accessible
+    :param int created_at: the timestamp at which the files were crawled
+    :param documents: pairs of a language code and a document to index, like from
+                      :meth:`ocdsindex.crawler.Crawler.get_documents`
+    :param bool relative_urls: whether to write URLs without the base URL
+    :param dict metadata: other keys to write in the header
+    :param stats: a :class:`~ocdsindex.stats.Stats` in which to record timings
+    """
+    stats = stats or NULL
+    header = {"base_url": base_url, "created_at": created_at, **(metadata or {})}
+    if relative_urls:
+        header["relative_urls"] = True
+    file.write(json.dumps(header) + "\n")
+    for language_code, document in documents:
+        with stats.timer("serialize"):
+            line = _relative(document, base_url) if relative_urls else document
+            file.write(json.dumps({"language": language_code, **line}) + "\n")
+
+
+def load(file, *, stats=None):
+    """
+    Read the documents to index from a file in either format.
+
+    A JSON file is read all at once. An NDJSON file is read one line at a time, as the groups are iterated. Relative
+    URLs are made absolute. To read a compressed file, pass the return value of :func:`decompress`.
+
+    :param file: a text file
+    :param stats: a :class:`~ocdsindex.stats.Stats` in which to record timings
+    :returns: the header, as a dict with ``base_url`` and ``created_at`` keys, and pairs of a language code and an
+              iterable of the documents to index in that language
+    :rtype: tuple
+    """
+    stats = stats or NULL
+    with stats.timer("deserialize"):
+        line = file.readline()
+        try:
+            header = json.loads(line)
+        except json.JSONDecodeError:  # a JSON file that is pretty-printed
+            header = json.loads(line + file.read())
+
+    base_url = header["base_url"] if header.pop("relative_urls", False) else None
+
+    if "documents" in header:
+        documents = header.pop("documents")
+        if base_url:
+            for values in documents.values():
+                for document in values:
+                    _absolute(document, base_url)
+        return header, documents.items()
+
+    return header, _groupby_language(file, stats, base_url)
+
+
+def _groupby_language(file, stats, base_url):
+    lines = (_loads(line, stats) for line in file if line.strip())
+    for language_code, documents in itertools.groupby(lines, key=itemgetter("language")):
+        yield language_code, (_without_language(document, base_url) for document in documents)
+
+
+def _loads(line, stats):
+    with stats.timer("deserialize"):
+        return json.loads(line)
+
+
+def _without_language(document, base_url):
+    del document["language"]
+    if base_url:
+        _absolute(document, base_url)
+    return document
@@ -0,0 +1,174 @@
+"""
+Record the timings and counters of a command's stages, to see where time is spent.
+
+Pass a :class:`~ocdsindex.stats.Stats` instance as the ``stats`` argument of :class:`~ocdsindex.crawler.Crawler`,
+:class:`~ocdsindex.extension_explorer.ExtensionExplorer`, the methods in :mod:`ocdsindex.serialize`, or the functions
+that the commands use, then read its :meth:`~ocdsindex.stats.Stats.as_dict` method.
+
+A stage's time is wall-clock time. If a stage runs in multiple threads or processes, like bulk requests with
+``--threads`` or files parsed with ``--workers``, its time is the sum of its time in each, so the stages' times can
+overlap, and their sum can exceed the total time.
+"""
+
+import heapq
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+
+class Stats:
+    """Record timings and counters. The methods are thread-safe."""
+
+    #: Whether timings and counters are recorded, to skip work that would only be used to record them.
+    enabled = True
+
+    def __init__(self, *, slowest=10):
+        """:param int slowest: the number of slowest files to record"""
+        self.slowest = slowest
+        self.start = time.perf_counter()
+        self.stages = defaultdict(lambda: {"calls": 0, "seconds": 0.0})
+        self.counters = defaultdict(int)
+        self.documents = defaultdict(int)
+        self.files = []  # a min-heap of (seconds, path)
+        self.bulk_requests = dict.fromkeys(("requests", "actions", "bytes", "max_actions", "max_bytes"), 0)
+        self.bulk_requests["seconds"] = 0.0
+        self.took = defaultdict(lambda: {"calls": 0, "milliseconds": 0})
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Record the time spent in the ``with`` block as a call to the stage.
+
+        :param str stage: the stage's name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_time(self, stage, seconds):
+        """
+        Record a call to the stage.
+
+        :param str stage: the stage's name
+        :param float seconds: the time spent in the call
+        """
+        with self.lock:
+            self.stages[stage]["calls"] += 1
+            self.stages[stage]["seconds"] += seconds
+
+    def increment(self, counter, value=1):
+        """
+        Increment the counter.
+
+        :param str counter: the counter's name
+        :param int value: the amount by which to increment the counter
+        """
+        with self.lock:
+            self.counters[counter] += value
+
+    def add_documents(self, language_code, count):
+        """
+        Record documents in the language.
+
+        :param str language_code: a language code
+        :param int count: the number of documents
+        """
+        with self.lock:
+            self.documents[language_code] += count
+
+    def add_file(self, path, seconds):
+        """
+        Record the time spent parsing and extracting a file, keeping only the slowest files.
+
+        :param str path: a file path
+        :param float seconds: the time spent
+        """
+        with self.lock:
+            if len(self.files) < self.slowest:
+                heapq.heappush(self.files, (seconds, path))
+            elif self.files and seconds > self.files[0][0]:
+                heapq.heapreplace(self.files, (seconds, path))
+
+    def add_bulk_request(self, actions, size, seconds):
+        """
+        Record a bulk request.
+
+        :param int actions: the number of actions
+        :param int size: the approximate size of the actions in bytes
+        :param float seconds: the time spent sending the request and processing its response
+        """
+        with self.lock:
+            self.bulk_requests["requests"] += 1
+            self.bulk_requests["actions"] += actions
+            self.bulk_requests["bytes"] += size
+            self.bulk_requests["max_actions"] = max(self.bulk_requests["max_actions"], actions)
+            self.bulk_requests["max_bytes"] = max(self.bulk_requests["max_bytes"], size)
+            self.bulk_requests["seconds"] += seconds
+
+    def add_took(self, operation, response):
+        """
+        Record the time that Elasticsearch reports having spent on an operation, if any.
+
+        :param str operation: the operation's name, like ``delete_by_query``
+        :param dict response: Elasticsearch's response, with a ``took`` key in milliseconds
+        """
+        if "took" not in response:
+            return
+        with self.lock:
+            self.took[operation]["calls"] += 1
+            self.took[operation]["milliseconds"] += response["took"]
+
+    def as_dict(self):
+        """
+        Return the timings and counters.
+
+        :returns: a dict with ``seconds`` (the total time), ``stages``, ``counters``, ``documents`` (per language),
+                  ``slowest_files``, ``bulk_requests`` and ``took`` (Elasticsearch's timings) keys
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "seconds": time.perf_counter() - self.start,
+                "stages": {stage: dict(value) for stage, value in self.stages.items()},
+                "counters": dict(self.counters),
+                "documents": dict(self.documents),
+                "slowest_files": [
+                    {"path": path, "seconds": seconds} for seconds, path in sorted(self.files, reverse=True)
+                ],
+                "bulk_requests": dict(self.bulk_requests),
+                "took": {operation: dict(value) for operation, value in self.took.items()},
+            }
+
+
+class NullStats:
+    """Record nothing. This is the default, to not spend time on timings and counters unless requested."""
+
+    enabled = False
+
+    def timer(self, _stage):
+        return nullcontext()
+
+    def add_time(self, stage, seconds):
+        pass
+
+    def increment(self, counter, value=1):
+        pass
+
+    def add_documents(self, language_code, count):
+        pass
+
+    def add_file(self, path, seconds):
+        pass
+
+    def add_bulk_request(self, actions, size, seconds):
+        pass
+
+    def add_took(self, operation, response):
+        pass
+
+
+NULL = NullStats()
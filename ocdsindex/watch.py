@@ -0,0 +1,262 @@
+"""
+Watch a crawler's directory for changed and deleted files.
+
+On Linux, the directory is watched with `inotify <https://man7.org/linux/man-pages/man7/inotify.7.html>`__. Otherwise,
+or if inotify is unavailable, the directory is polled. Either way, the changes are found by comparing the modification
+time and size of each file that the crawler crawls: inotify only signals when to compare them.
+"""
+
+import ctypes
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# https://man7.org/linux/man-pages/man7/inotify.7.html
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+
+# struct inotify_event {int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[];}
+_event = struct.Struct("iIII")
+
+
+def snapshot(paths_by_language):
+    """
+    Return the language code, modification time and size of each file.
+
+    :param dict paths_by_language: a dict in which the key is a language code and the value is file paths, like the
+                                   return value of :meth:`~ocdsindex.crawler.Crawler.get_paths_by_language`
+    :returns: a dict in which the key is a file path and the value is a tuple
+    :rtype: dict
+    """
+    files = {}
+    for language_code, paths in paths_by_language.items():
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # deleted since the directory was walked
+                continue
+            files[path] = (language_code, stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def diff(old, new):
+    """
+    Return the changed files, including new files, and the deleted files between two snapshots.
+
+    :param dict old: a return value of :func:`snapshot`
+    :param dict new: a later return value of :func:`snapshot`
+    :returns: a dict in which the key is a changed file's path and the value is its language code, and a list of the
+              deleted files' paths
+    :rtype: tuple
+    """
+    changed = {path: value[0] for path, value in sorted(new.items()) if old.get(path) != value}
+    deleted = sorted(old.keys() - new.keys())
+    return changed, deleted
+
+
+class Poller:
+    """Wait for changes to files, by comparing snapshots at an interval."""
+
+    def __init__(self, scan, *, interval=1.0):
+        """
+        :param scan: a function that returns a snapshot of the files, like :func:`snapshot`
+        :param float interval: the number of seconds between snapshots
+        """
+        self.scan = scan
+        self.interval = interval
+        self.last = scan()
+
+    def wait(self, timeout=None):
+        """
+        Wait for a change.
+
+        :param float timeout: the maximum number of seconds to wait, or ``None`` to wait indefinitely
+        :returns: whether a change occurred
+        :rtype: bool
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            seconds = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            time.sleep(max(seconds, 0))
+            current = self.scan()
+            if current != self.last:
+                self.last = current
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def close(self):
+        pass
+
+
+class Inotify:
+    """Wait for changes to files, using inotify."""
+
+    def __init__(self, directory):
+        """
+        :param str directory: the directory to watch, including its subdirectories
+        :raises OSError: if inotify is unavailable, or if the directory can't be watched, for example, if the limit on
+                         the number of watches is reached
+        """
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify requires Linux")
+
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise _error()
+        # The directory of each watch descriptor.
+        self.watches = {}
+
+        try:
+            self.add_watches(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def add_watches(self, directory):
+        """
+        Watch the directory and its subdirectories.
+
+        :param str directory: a directory
+        """
+        for root, _, _ in os.walk(directory):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), MASK)
+            if wd < 0:
+                if ctypes.get_errno() == errno.ENOENT:  # deleted since the directory was walked
+                    continue
+                raise _error(root)
+            self.watches[wd] = root
+
+    def wait(self, timeout=None):
+        """
+        Wait for a change.
+
+        :param float timeout: the maximum number of seconds to wait, or ``None`` to wait indefinitely
+        :returns: whether a change occurred
+        :rtype: bool
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return True
+            self._read_events(data)
+
+    def _read_events(self, data):
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _event.unpack_from(data, offset)
+            offset += _event.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_IGNORED:  # the directory was deleted
+                self.watches.pop(wd, None)
+            elif mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and wd in self.watches:
+                self.add_watches(os.path.join(self.watches[wd], name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _error(filename=None):
+    number = ctypes.get_errno()
+    return OSError(number, os.strerror(number), filename)
+
+
+class Watcher:
+    """Watch a crawler's directory for changed and deleted files."""
+
+    def __init__(self, crawler, *, debounce=1.0, poll=False, interval=1.0):
+        """
+        :param crawler: a :class:`~ocdsindex.crawler.Crawler`
+        :param float debounce: the number of seconds without changes, after which changes are reported
+        :param bool poll: whether to poll the directory, instead of using inotify
+        :param float interval: the number of seconds between polls
+        """
+        self.crawler = crawler
+        self.debounce = debounce
+
+        self.notifier = None
+        if not poll:
+            try:
+                self.notifier = Inotify(crawler.directory)
+            except (OSError, AttributeError) as e:  # AttributeError if libc has no inotify functions
+                logger.warning("inotify is unavailable, polling instead: %s", e)
+        if self.notifier is None:
+            self.notifier = Poller(self.scan, interval=interval)
+
+        # Take the first snapshot after starting to watch, so that no changes are missed.
+        self.last = self.scan()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def scan(self):
+        """
+        Return a snapshot of the files that the crawler crawls.
+
+        :rtype: dict
+        """
+        return snapshot(self.crawler.get_paths_by_language())
+
+    def get_changes(self, timeout=None):
+        """
+        Yield the changed and deleted files since the last snapshot, once no changes occur for ``debounce`` seconds.
+
+        :param float timeout: if not ``None``, yield no changes if no changes occur for this many seconds, so that the
+                              caller can perform periodic work
+        :returns: pairs of a dict, in which the key is a changed file's path and the value is its language code, and a
+                  list of the deleted files' paths
+        :rtype: generator
+        """
+        while True:
+            if not self.notifier.wait(timeout):
+                yield {}, []
+                continue
+            while self.notifier.wait(self.debounce):
+                pass
+
+            current = self.scan()
+            changed, deleted = diff(self.last, current)
+            self.last = current
+            if changed or deleted:
+                yield changed, deleted
+
+    def close(self):
+        self.notifier.close()
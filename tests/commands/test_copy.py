@@ -2,13 +2,15 @@ import os
 import traceback
 from collections import defaultdict
 
+import pytest
 from click.testing import CliRunner
 
 from ocdsindex.__main__ import main
 from tests import elasticsearch, search
 
 
-def test_copy(tmpdir):
+@pytest.mark.parametrize("args", [["--chunk-size", "2"], ["--server-side"]])
+def test_copy(tmpdir, args):
     host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
 
     runner = CliRunner()
@@ -25,10 +27,11 @@ def test_copy(tmpdir):
         source = "https://standard.open-contracting.org/dev/"
         destination = "https://standard.open-contracting.org/copy/"
 
-        result = runner.invoke(main, ["copy", host, source, destination])
+        result = runner.invoke(main, ["copy", host, source, destination, *args])
 
         assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
         assert result.output == ""
+        assert not es.indices.exists(index="ocdsindex_en-0001-copy")
 
         for index, value in (("ocdsindex_en", 8), ("ocdsindex_es", 1)):
             hits = search(es, index)
@@ -42,3 +45,40 @@ def test_copy(tmpdir):
                 destination: value,
             }
             assert hits["total"]["value"] == value * 2
+
+
+@pytest.mark.parametrize("args", [["--chunk-size", "2"], ["--server-side"]])
+def test_copy_deduplicate(args):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    with elasticsearch(host) as es:
+        result = runner.invoke(
+            main, ["index", host, os.path.join("tests", "fixtures", "success", "data.json"), "--deduplicate"]
+        )
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+
+        es.indices.refresh(index="ocdsindex_en")
+        es.indices.refresh(index="ocdsindex_es")
+
+        source = "https://standard.open-contracting.org/dev/"
+        destination = "https://standard.open-contracting.org/copy/"
+
+        result = runner.invoke(main, ["copy", host, source, destination, *args])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.output == ""
+        assert not es.indices.exists(index="ocdsindex_en-0001-copy")
+
+        for index, value in (("ocdsindex_en", 8), ("ocdsindex_es", 1)):
+            hits = search(es, index)
+
+            assert hits["total"]["value"] == value
+            for hit in hits["hits"]:
+                assert hit["_source"]["base_url"] == [source, destination]
+                assert hit["_source"]["url"] == [
+                    hit["_source"]["url"][0],
+                    hit["_source"]["url"][0].replace(source, destination),
+                ]
@@ -46,16 +46,94 @@ def test_expire(tmpdir):
         # Add old data to keep.
         index("https://standard.open-contracting.org/keep/", 20000000, 24)
 
+        # With --dry-run.
+        result = runner.invoke(main, ["expire", host, "--exclude-file", str(exclude_file), "--dry-run"])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.output == "9\n"
+        assert search(es, "ocdsindex_en")["total"]["value"] == 24
+
+        # With --days.
+        result = runner.invoke(main, ["expire", host, "--days", "300"])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.stdout == ""
+        assert search(es, "ocdsindex_en")["total"]["value"] == 24
+
         # With --exclude-file.
-        result = runner.invoke(main, ["expire", host, "--exclude-file", str(exclude_file)])
+        result = runner.invoke(
+            main, ["expire", host, "--exclude-file", str(exclude_file), "--requests-per-second", "1000"]
+        )
 
         assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
-        assert result.output == ""
+        assert result.stdout == ""
+        assert "expire: 9/9\n" in result.stderr
         assert search(es, "ocdsindex_en")["total"]["value"] == 16
 
         # Without --exclude-file.
         result = runner.invoke(main, ["expire", host])
 
         assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
-        assert result.output == ""
+        assert result.stdout == ""
         assert search(es, "ocdsindex_en")["total"]["value"] == 8
+
+
+def test_expire_monthly(tmpdir):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    filename = tmpdir.join("data.json")
+    with open(os.path.join("tests", "fixtures", "success", "data.json")) as f:
+        data = json.load(f)
+
+    exclude_file = tmpdir.join("exclude.txt")
+    exclude_file.write("https://standard.open-contracting.org/keep/\n")
+
+    now = int(time.time())
+    current = f"ocdsindex_en-0001-{time.strftime('%Y.%m', time.gmtime(now))}"
+    old = f"ocdsindex_en-0001-{time.strftime('%Y.%m', time.gmtime(now - 20000000))}"
+
+    with elasticsearch(host) as es:
+
+        def index(base_url, offset):
+            data["base_url"] = base_url
+            data["created_at"] = now - offset
+            for documents in data["documents"].values():
+                for document in documents:
+                    document["url"] = f"{base_url}{document['url'][42:]}"
+
+            filename.write(json.dumps(data))
+            result = runner.invoke(main, ["index", host, str(filename), "--monthly"])
+
+            assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+            assert result.output == ""
+
+        index("https://standard.open-contracting.org/new/", 0)
+        index("https://standard.open-contracting.org/old/", 20000000)
+        index("https://standard.open-contracting.org/keep/", 20000000)
+
+        assert sorted(es.indices.get_alias(name="ocdsindex_en")) == sorted([current, old])
+        assert search(es, "ocdsindex_en")["total"]["value"] == 24
+
+        result = runner.invoke(main, ["expire", host, "--exclude-file", str(exclude_file)])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.stdout == ""
+        assert f"ocdsindex_en: deleted {old}\n" in result.stderr
+
+        assert list(es.indices.get_alias(name="ocdsindex_en")) == [current]
+        assert search(es, "ocdsindex_en")["total"]["value"] == 16
+        assert search(es, current)["total"]["value"] == 16
+
+
+def test_expire_days_refresh_after():
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    result = CliRunner().invoke(main, ["expire", host, "--days", "30"])
+
+    assert result.exit_code == 2
+    assert (
+        "Invalid value for '--days': 30 is not more than 30, the number of days after which the timestamps of "
+        "unchanged documents are updated" in result.stderr
+    )
@@ -0,0 +1,58 @@
+import json
+import os.path
+import time
+import traceback
+
+import pytest
+from click.testing import CliRunner
+
+from ocdsindex.__main__ import main
+
+path = os.path.join("tests", "fixtures", "extension_explorer", "extensions.json")
+
+
+def test_extension_explorer():
+    runner = CliRunner()
+
+    result = runner.invoke(main, ["extension-explorer", path])
+
+    actual = json.loads(result.output)
+
+    assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+    assert len(actual) == 3
+    assert actual["base_url"] == "https://extensions.open-contracting.org/"
+    assert actual["created_at"] == pytest.approx(time.time())
+    assert {language_code: len(documents) for language_code, documents in actual["documents"].items()} == {
+        "en": 7,
+        "es": 1,
+    }
+    assert actual["documents"]["es"] == [
+        {
+            "url": "https://extensions.open-contracting.org/es/extensions/bids/v1.1.5/#estadísticas-y-detalles-de-ofertas",
+            "title": "Estadísticas y detalles de ofertas",
+            "text": "La extensión agrega ofertas.",
+        }
+    ]
+
+
+def test_extension_explorer_workers():
+    runner = CliRunner()
+
+    result = runner.invoke(main, ["extension-explorer", path, "--workers", "2"])
+    expected_result = runner.invoke(main, ["extension-explorer", path])
+
+    assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+    assert json.loads(result.output)["documents"] == json.loads(expected_result.output)["documents"]
+
+
+def test_extension_explorer_ndjson():
+    runner = CliRunner()
+
+    result = runner.invoke(main, ["extension-explorer", path, "--format", "ndjson"])
+
+    header, *lines = [json.loads(line) for line in result.output.splitlines()]
+
+    assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+    assert header["base_url"] == "https://extensions.open-contracting.org/"
+    assert len(header) == 2
+    assert [line["language"] for line in lines] == ["en", "en", "en", "es", "en", "en", "en", "en"]
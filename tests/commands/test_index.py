@@ -1,10 +1,14 @@
+import gzip
+import importlib.util
 import json
 import os
+import time
 import traceback
 
+import pytest
 from click.testing import CliRunner
 
-from ocdsindex.__main__ import main
+from ocdsindex.__main__ import connect, hash_document, main
 from tests import elasticsearch, search
 
 
@@ -33,6 +37,7 @@ def test_index(tmpdir):
                 "text": {"analyzer": "english", "type": "text"},
                 "base_url": {"type": "keyword"},
                 "created_at": {"type": "date"},
+                "hash": {"index": False, "type": "keyword"},
                 "url": {"fields": {"keyword": {"ignore_above": 256, "type": "keyword"}}, "type": "text"},
             }
         }
@@ -42,6 +47,7 @@ def test_index(tmpdir):
                 "text": {"analyzer": "spanish", "type": "text"},
                 "base_url": {"type": "keyword"},
                 "created_at": {"type": "date"},
+                "hash": {"index": False, "type": "keyword"},
                 "url": {"fields": {"keyword": {"ignore_above": 256, "type": "keyword"}}, "type": "text"},
             }
         }
@@ -62,6 +68,7 @@ def test_index(tmpdir):
                 "base_url": "https://standard.open-contracting.org/dev/",
                 "created_at": 1577880000,
                 "url": "https://standard.open-contracting.org/dev/en/#about",
+                "hash": hash_document(data["documents"]["en"][0]),
             },
         } in hits_en["hits"]
         assert {
@@ -74,6 +81,7 @@ def test_index(tmpdir):
                 "base_url": "https://standard.open-contracting.org/dev/",
                 "created_at": 1577880000,
                 "url": "https://standard.open-contracting.org/dev/es/#about",
+                "hash": hash_document(data["documents"]["es"][0]),
             },
         } in hits_es["hits"]
 
@@ -93,3 +101,526 @@ def test_index(tmpdir):
 
         assert hits_en["total"]["value"] == 1
         assert hits_es["total"]["value"] == 1
+
+
+def test_index_ndjson(tmpdir):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    filename = tmpdir.join("data.ndjson")
+    with open(os.path.join("tests", "fixtures", "success", "data.json")) as f:
+        data = json.load(f)
+
+    lines = [{"base_url": data["base_url"], "created_at": data["created_at"]}]
+    for language_code, documents in data["documents"].items():
+        lines.extend({"language": language_code, **document} for document in documents)
+
+    with elasticsearch(host) as es:
+        filename.write("".join(f"{json.dumps(line)}\n" for line in lines))
+        result = runner.invoke(main, ["index", host, str(filename)])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.output == ""
+
+        assert search(es, "ocdsindex_en")["total"]["value"] == 8
+        assert search(es, "ocdsindex_es")["total"]["value"] == 1
+
+
+def test_index_compression(tmpdir):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    filename = tmpdir.join("data.ndjson.gz")
+    with open(os.path.join("tests", "fixtures", "success", "data.json")) as f:
+        data = json.load(f)
+
+    lines = [{"base_url": data["base_url"], "created_at": data["created_at"], "relative_urls": True}]
+    for language_code, documents in data["documents"].items():
+        lines.extend(
+            {"language": language_code, **document, "url": document["url"].removeprefix(data["base_url"])}
+            for document in documents
+        )
+
+    with elasticsearch(host) as es:
+        filename.write_binary(gzip.compress("".join(f"{json.dumps(line)}\n" for line in lines).encode()))
+        result = runner.invoke(main, ["index", host, str(filename)])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.output == ""
+
+        hits = search(es, "ocdsindex_es")
+
+        assert search(es, "ocdsindex_en")["total"]["value"] == 8
+        assert hits["hits"][0]["_id"] == "https://standard.open-contracting.org/dev/es/#about"
+
+
+def test_index_chunks():
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    with elasticsearch(host) as es:
+        result = runner.invoke(
+            main,
+            [
+                "index",
+                host,
+                os.path.join("tests", "fixtures", "success", "data.json"),
+                "--chunk-size",
+                "2",
+                "--max-chunk-bytes",
+                "1000",
+                "--threads",
+                "3",
+            ],
+        )
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.output == ""
+
+        assert search(es, "ocdsindex_en")["total"]["value"] == 8
+        assert search(es, "ocdsindex_es")["total"]["value"] == 1
+
+
+def test_index_stats():
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    with elasticsearch(host):
+        result = runner.invoke(
+            main,
+            ["index", host, os.path.join("tests", "fixtures", "success", "data.json"), "--chunk-size", "5", "--stats"],
+        )
+
+        stats = json.loads(result.stderr)
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.stdout == ""
+        assert stats["command"] == "index"
+        assert set(stats["stages"]) == {"deserialize", "create_index", "delete_by_query", "bulk"}
+        assert stats["counters"] == {"index": 9}
+        assert stats["documents"] == {"en": 8, "es": 1}
+        assert stats["bulk_requests"]["requests"] == 2
+        assert stats["bulk_requests"]["actions"] == 9
+        assert stats["bulk_requests"]["max_actions"] == 5
+        assert stats["took"]["delete_by_query"]["calls"] == 2
+
+
+@pytest.mark.parametrize("ndjson", [False, True])
+def test_index_concurrency(tmpdir, ndjson):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    filename = tmpdir.join("data.ndjson")
+    with open(os.path.join("tests", "fixtures", "success", "data.json")) as f:
+        data = json.load(f)
+
+    if ndjson:
+        lines = [{"base_url": data["base_url"], "created_at": data["created_at"]}]
+        for language_code, documents in data["documents"].items():
+            lines.extend({"language": language_code, **document} for document in documents)
+        filename.write("".join(f"{json.dumps(line)}\n" for line in lines))
+    else:
+        filename.write(json.dumps(data))
+
+    with elasticsearch(host) as es:
+        result = runner.invoke(
+            main,
+            ["index", host, str(filename), "--concurrency", "2", "--connections-per-node", "4", "--chunk-size", "3"],
+        )
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.output == ""
+
+        assert search(es, "ocdsindex_en")["total"]["value"] == 8
+        assert search(es, "ocdsindex_es")["total"]["value"] == 1
+
+
+def test_index_concurrency_not_contiguous(tmpdir):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    filename = tmpdir.join("data.ndjson")
+    with open(os.path.join("tests", "fixtures", "success", "data.json")) as f:
+        data = json.load(f)
+
+    lines = [
+        {"base_url": data["base_url"], "created_at": data["created_at"]},
+        *(
+            {"language": language_code, **data["documents"][language_code].pop()}
+            for language_code in ("en", "es", "en")
+        ),
+    ]
+
+    with elasticsearch(host):
+        filename.write("".join(f"{json.dumps(line)}\n" for line in lines))
+        result = runner.invoke(main, ["index", host, str(filename), "--concurrency", "2"])
+
+        assert result.exit_code == 1
+        assert result.stderr == "Error: The documents in en are not contiguous\n"
+
+
+def test_index_bulk_load():
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    with elasticsearch(host) as es:
+        result = runner.invoke(
+            main,
+            ["index", host, os.path.join("tests", "fixtures", "success", "data.json"), "--bulk-load", "--force-merge"],
+        )
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.output == ""
+
+        assert search(es, "ocdsindex_en")["total"]["value"] == 8
+        assert search(es, "ocdsindex_es")["total"]["value"] == 1
+
+        settings = es.indices.get_settings(index="ocdsindex_en", flat_settings=True)["ocdsindex_en-0001"]["settings"]
+        assert "index.refresh_interval" not in settings
+        assert settings["index.number_of_replicas"] == "1"
+
+
+def test_index_blue_green(tmpdir):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    filename = tmpdir.join("data.json")
+    with open(os.path.join("tests", "fixtures", "success", "data.json")) as f:
+        data = json.load(f)
+
+    with elasticsearch(host) as es:
+        result = runner.invoke(main, ["index", host, os.path.join("tests", "fixtures", "success", "data.json")])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+
+        # Index the same documents with another base URL.
+        for documents in data["documents"].values():
+            for document in documents:
+                document["url"] = document["url"].replace(
+                    data["base_url"], "https://standard.open-contracting.org/other/"
+                )
+        data["base_url"] = "https://standard.open-contracting.org/other/"
+        data["documents"]["en"] = data["documents"]["en"][:2]
+        filename.write(json.dumps(data))
+        result = runner.invoke(main, ["index", host, str(filename), "--blue-green"])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.output == ""
+
+        assert list(es.indices.get_alias(name="ocdsindex_en")) == ["ocdsindex_en-0002"]
+        assert list(es.indices.get_alias(name="ocdsindex_es")) == ["ocdsindex_es-0002"]
+        assert not es.indices.exists(index="ocdsindex_en-0001")
+
+        assert search(es, "ocdsindex_en")["total"]["value"] == 10
+        assert search(es, "ocdsindex_es")["total"]["value"] == 2
+
+        # Replace the documents with the other base URL.
+        data["documents"]["en"] = data["documents"]["en"][:1]
+        filename.write(json.dumps(data))
+        result = runner.invoke(main, ["index", host, str(filename), "--blue-green"])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+
+        assert list(es.indices.get_alias(name="ocdsindex_en")) == ["ocdsindex_en-0003"]
+        assert search(es, "ocdsindex_en")["total"]["value"] == 9
+
+
+def test_index_blue_green_incremental():
+    result = CliRunner().invoke(
+        main,
+        [
+            "index",
+            "http://localhost:9200",
+            os.path.join("tests", "fixtures", "success", "data.json"),
+            "--blue-green",
+            "--incremental",
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert "--incremental and --blue-green are mutually exclusive" in result.stderr
+
+
+@pytest.mark.parametrize("args", [[], ["--incremental"], ["--concurrency", "2"]])
+def test_index_after_monthly(tmpdir, args):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    filename = tmpdir.join("data.json")
+    with open(os.path.join("tests", "fixtures", "success", "data.json")) as f:
+        data = json.load(f)
+
+    current = f"ocdsindex_en-0001-{time.strftime('%Y.%m', time.gmtime(data['created_at']))}"
+
+    def write(base_url):
+        for documents in data["documents"].values():
+            for document in documents:
+                document["url"] = document["url"].replace(data["base_url"], base_url)
+        data["base_url"] = base_url
+        filename.write(json.dumps(data))
+
+    with elasticsearch(host) as es:
+        result = runner.invoke(main, ["index", host, os.path.join("tests", "fixtures", "success", "data.json")])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+
+        write("https://standard.open-contracting.org/monthly/")
+        result = runner.invoke(main, ["index", host, str(filename), "--monthly"])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert sorted(es.indices.get_alias(name="ocdsindex_en")) == ["ocdsindex_en-0001", current]
+
+        # The alias points to more than one index, so new documents are written to its write index.
+        write("https://standard.open-contracting.org/other/")
+        result = runner.invoke(main, ["index", host, str(filename), *args])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.output == ""
+
+        assert search(es, "ocdsindex_en")["total"]["value"] == 24
+        assert search(es, "ocdsindex_en-0001")["total"]["value"] == 8
+        assert search(es, current)["total"]["value"] == 16
+
+
+def test_index_deduplicate(monkeypatch, tmpdir):
+    # Look up the IDs of the documents in more than one chunk.
+    monkeypatch.setattr("ocdsindex.__main__.MGET_SIZE", 3)
+
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    filename = tmpdir.join("data.json")
+    with open(os.path.join("tests", "fixtures", "success", "data.json")) as f:
+        data = json.load(f)
+
+    dev = data["base_url"]
+    other = "https://standard.open-contracting.org/other/"
+
+    def write(base_url, count):
+        copy = json.loads(json.dumps(data))
+        copy["base_url"] = base_url
+        copy["documents"]["en"] = copy["documents"]["en"][:count]
+        for document in copy["documents"]["en"]:
+            document["url"] = document["url"].replace(dev, base_url)
+        filename.write(json.dumps(copy))
+
+    with elasticsearch(host) as es:
+        for base_url in (dev, other):
+            write(base_url, 8)
+            result = runner.invoke(main, ["index", host, str(filename), "--deduplicate"])
+
+            assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+            assert result.output == ""
+
+        hits = search(es, "ocdsindex_en")
+
+        assert hits["total"]["value"] == 8
+        assert {hit["_id"]: hit["_source"] for hit in hits["hits"]}[hash_document(data["documents"]["en"][0])] == {
+            "title": "Open Contracting Data Standard: Documentation - About",
+            "text": "The Open Contracting Data Standard",
+            "base_url": [dev, other],
+            "created_at": 1577880000,
+            "url": [f"{dev}en/#about", f"{other}en/#about"],
+            "hash": hash_document(data["documents"]["en"][0]),
+        }
+        assert search(es, "ocdsindex_es")["total"]["value"] == 1
+
+        # Remove documents from one base URL, then the other.
+        write(other, 2)
+        result = runner.invoke(main, ["index", host, str(filename), "--deduplicate"])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert search(es, "ocdsindex_en")["total"]["value"] == 8
+
+        write(dev, 1)
+        result = runner.invoke(main, ["index", host, str(filename), "--deduplicate"])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+
+        hits = search(es, "ocdsindex_en")
+
+        assert hits["total"]["value"] == 2
+        assert sorted(sorted(hit["_source"]["base_url"]) for hit in hits["hits"]) == [[dev, other], [other]]
+
+        # Indexing without --deduplicate would delete the documents that other base URLs share.
+        result = runner.invoke(main, ["index", host, str(filename)])
+
+        assert result.exit_code == 1
+        assert "has deduplicated documents: use index --deduplicate\n" in result.stderr
+        assert search(es, "ocdsindex_en")["total"]["value"] == 2
+
+
+@pytest.mark.parametrize("option", ["--incremental", "--blue-green", "--monthly"])
+def test_index_deduplicate_exclusive(option):
+    result = CliRunner().invoke(
+        main,
+        [
+            "index",
+            "http://localhost:9200",
+            os.path.join("tests", "fixtures", "success", "data.json"),
+            "--deduplicate",
+            option,
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert f"--deduplicate and {option} are mutually exclusive" in result.stderr
+
+
+def test_index_connection_options(tmpdir):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    filename = tmpdir.join("data.json")
+    with open(os.path.join("tests", "fixtures", "success", "data.json")) as f:
+        filename.write(f.read())
+
+    with elasticsearch(host) as es:
+        result = runner.invoke(
+            main,
+            [
+                "index",
+                host,
+                str(filename),
+                "--node-class",
+                "urllib3",
+                "--http-compress",
+                "--request-timeout",
+                "20",
+                "--request-retries",
+                "1",
+                "--retry-backoff",
+                "0",
+                "--bulk-timeout",
+                "60",
+            ],
+        )
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.output == ""
+
+        assert search(es, "ocdsindex_en")["total"]["value"] == 8
+        assert search(es, "ocdsindex_es")["total"]["value"] == 1
+
+
+def test_connect():
+    es = connect(
+        "http://localhost:9200",
+        node_class="urllib3",
+        http_compress=True,
+        connections_per_node=4,
+        request_timeout=20,
+        max_retries=5,
+        retry_on_timeout=True,
+        retry_backoff=0.5,
+    )
+
+    node = es.transport.node_pool.get()
+
+    assert type(node).__name__ == "Urllib3HttpNode"
+    assert node.config.http_compress
+    assert node.config.connections_per_node == 4
+
+
+@pytest.mark.skipif(importlib.util.find_spec("httpx") is not None, reason="httpx is installed")
+def test_index_node_class_missing():
+    result = CliRunner().invoke(
+        main,
+        [
+            "index",
+            "http://localhost:9200",
+            os.path.join("tests", "fixtures", "success", "data.json"),
+            "--node-class",
+            "httpx",
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert "httpx requires the httpx package" in result.stderr
+
+
+def test_index_manifest(tmpdir):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    filename = tmpdir.join("data.json")
+    manifest = tmpdir.join("manifest.json")
+    with open(os.path.join("tests", "fixtures", "success", "data.json")) as f:
+        data = json.load(f)
+    fingerprints = {"en": "a", "es": "b"}
+
+    with elasticsearch(host) as es:
+        filename.write(json.dumps({**data, "fingerprints": fingerprints, "unchanged": []}))
+        result = runner.invoke(main, ["index", host, str(filename), "--manifest", str(manifest)])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert json.loads(manifest.read()) == fingerprints
+
+        # English is unchanged. Another language is unchanged, but not indexed.
+        unchanged = {**data, "fingerprints": {**fingerprints, "fr": "c"}, "unchanged": ["en", "fr"], "documents": {}}
+        filename.write(json.dumps(unchanged))
+        result = runner.invoke(main, ["index", host, str(filename), "--manifest", str(manifest)])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.stderr == "fr: unchanged, but ocdsindex_fr doesn't exist\n"
+        assert json.loads(manifest.read()) == fingerprints
+
+        assert search(es, "ocdsindex_en")["total"]["value"] == 8
+        assert search(es, "ocdsindex_es")["total"]["value"] == 1
+
+
+def test_index_incremental(tmpdir):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    filename = tmpdir.join("data.json")
+    with open(os.path.join("tests", "fixtures", "success", "data.json")) as f:
+        data = json.load(f)
+
+    with elasticsearch(host) as es:
+        filename.write(json.dumps(data))
+        result = runner.invoke(main, ["index", host, str(filename)])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+
+        es.indices.refresh(index="ocdsindex_en")
+        versions = {
+            hit["_id"]: hit["_version"]
+            for hit in es.search(index="ocdsindex_en", size=100, version=True)["hits"]["hits"]
+        }
+
+        # Change one document, remove one document, and keep the others.
+        data["created_at"] += 60
+        data["documents"]["en"][0]["text"] = "Changed"
+        removed = data["documents"]["en"].pop()
+
+        filename.write(json.dumps(data))
+        result = runner.invoke(main, ["index", host, str(filename), "--incremental"])
+
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+        assert result.output == ""
+
+        hits = search(es, "ocdsindex_en")
+        changed = {
+            hit["_id"]
+            for hit in es.search(index="ocdsindex_en", size=100, version=True)["hits"]["hits"]
+            if hit["_version"] != versions[hit["_id"]]
+        }
+
+        assert hits["total"]["value"] == 7
+        assert removed["url"] not in {hit["_id"] for hit in hits["hits"]}
+        assert changed == {data["documents"]["en"][0]["url"]}
+        assert search(es, "ocdsindex_es")["total"]["value"] == 1
@@ -24,7 +24,8 @@ def test_reindex(tmpdir):
 
         result = runner.invoke(main, ["reindex", host])
         assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
-        assert result.output == ""
+        assert result.stdout == ""
+        assert "ocdsindex_en-0001: 8/8\n" in result.stderr
 
         # Old indices were deleted.
         assert not es.indices.exists(index=index_en_before)
@@ -37,3 +38,29 @@ def test_reindex(tmpdir):
         # Aliases still resolve.
         assert es.indices.exists(index="ocdsindex_en")
         assert es.indices.exists(index="ocdsindex_es")
+
+
+def test_reindex_monthly(tmpdir):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    runner = CliRunner()
+
+    filename = tmpdir.join("data.json")
+    with open(os.path.join("tests", "fixtures", "success", "data.json")) as f:
+        filename.write(f.read().replace("/dev/", "/monthly/"))
+
+    with elasticsearch(host) as es:
+        result = runner.invoke(main, ["index", host, os.path.join("tests", "fixtures", "success", "data.json")])
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+
+        result = runner.invoke(main, ["index", host, str(filename), "--monthly"])
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+
+        result = runner.invoke(main, ["reindex", host])
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+
+        # The alias still has a write index.
+        result = runner.invoke(main, ["index", host, os.path.join("tests", "fixtures", "success", "data.json")])
+        assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+
+        assert search(es, "ocdsindex_en")["total"]["value"] == 16
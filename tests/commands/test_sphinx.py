@@ -1,3 +1,4 @@
+import gzip
 import json
 import os.path
 import time
@@ -6,6 +7,7 @@ import traceback
 import pytest
 from click.testing import CliRunner
 
+from ocdsindex import serialize
 from ocdsindex.__main__ import main
 from tests import expected
 
@@ -23,3 +25,154 @@ def test_sphinx():
     assert actual["base_url"] == base_url
     assert actual["created_at"] == pytest.approx(time.time())
     assert set(actual["documents"]) == set(expected)
+
+
+def test_sphinx_workers():
+    runner = CliRunner()
+
+    base_url = "https://standard.open-contracting.org/dev/"
+    directory = os.path.join("tests", "fixtures", "success")
+    result = runner.invoke(main, ["sphinx", directory, base_url, "--workers", "2"])
+    expected_result = runner.invoke(main, ["sphinx", directory, base_url])
+
+    actual = json.loads(result.output)
+
+    assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+    assert actual["documents"] == json.loads(expected_result.output)["documents"]
+
+
+def test_sphinx_streaming():
+    runner = CliRunner()
+
+    base_url = "https://standard.open-contracting.org/dev/"
+    directory = os.path.join("tests", "fixtures", "success")
+    result = runner.invoke(main, ["sphinx", directory, base_url, "--extractor", "sphinx-streaming"])
+    expected_result = runner.invoke(main, ["sphinx", directory, base_url])
+
+    actual = json.loads(result.output)
+
+    assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+    assert actual["documents"] == json.loads(expected_result.output)["documents"]
+
+
+def test_sphinx_extractor_unknown():
+    runner = CliRunner()
+
+    result = runner.invoke(
+        main,
+        ["sphinx", os.path.join("tests", "fixtures", "success"), "https://example.com/", "--extractor", "nonexistent"],
+    )
+
+    assert result.exit_code == 2
+    assert "Invalid value for '--extractor': 'nonexistent' is not one of sphinx, sphinx-streaming" in result.stderr
+
+
+def test_sphinx_ndjson():
+    runner = CliRunner()
+
+    base_url = "https://standard.open-contracting.org/dev/"
+    result = runner.invoke(
+        main, ["sphinx", os.path.join("tests", "fixtures", "success"), base_url, "--format", "ndjson"]
+    )
+
+    header, *lines = [json.loads(line) for line in result.output.splitlines()]
+
+    assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+    assert header["base_url"] == base_url
+    assert header["created_at"] == pytest.approx(time.time())
+    assert len(header) == 2
+    assert {line["language"] for line in lines} == set(expected)
+
+
+def test_sphinx_cache(tmpdir):
+    runner = CliRunner()
+
+    base_url = "https://standard.open-contracting.org/dev/"
+    args = ["sphinx", os.path.join("tests", "fixtures", "success"), base_url, "--cache-dir", str(tmpdir)]
+
+    cold = runner.invoke(main, args)
+    warm = runner.invoke(main, args)
+
+    assert cold.exit_code == 0, traceback.print_exception(*cold.exc_info)
+    assert warm.exit_code == 0, traceback.print_exception(*warm.exc_info)
+    assert json.loads(warm.output)["documents"] == json.loads(cold.output)["documents"]
+    assert os.path.exists(tmpdir.join("cache.sqlite3"))
+
+
+def test_sphinx_stats():
+    runner = CliRunner()
+
+    base_url = "https://standard.open-contracting.org/dev/"
+    directory = os.path.join("tests", "fixtures", "success")
+    result = runner.invoke(main, ["sphinx", directory, base_url, "--format", "ndjson", "--stats"])
+
+    stats = json.loads(result.stderr)
+
+    assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+    assert len(result.stdout.splitlines()) == 10
+    assert stats["command"] == "sphinx"
+    assert set(stats["stages"]) == {"crawl", "parse", "extract", "serialize"}
+    assert stats["stages"]["serialize"]["calls"] == 9
+    assert stats["documents"] == {"en": 8, "es": 1}
+    assert len(stats["slowest_files"]) == 6
+
+
+def test_sphinx_compression():
+    runner = CliRunner()
+
+    base_url = "https://standard.open-contracting.org/dev/"
+    directory = os.path.join("tests", "fixtures", "success")
+    args = ["--format", "ndjson"]
+    result = runner.invoke(main, ["sphinx", directory, base_url, *args, "--compression", "gzip", "--relative-urls"])
+    expected_result = runner.invoke(main, ["sphinx", directory, base_url, *args])
+
+    header, *lines = [json.loads(line) for line in gzip.decompress(result.stdout_bytes).splitlines()]
+    expected_header, *expected_lines = [json.loads(line) for line in expected_result.output.splitlines()]
+
+    assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+    assert header == {**expected_header, "relative_urls": True}
+    assert [{**line, "url": f"{base_url}{line['url']}"} for line in lines] == expected_lines
+
+
+def test_sphinx_compression_missing(monkeypatch):
+    monkeypatch.setattr(serialize, "zstd", None)
+
+    runner = CliRunner()
+
+    result = runner.invoke(
+        main,
+        ["sphinx", os.path.join("tests", "fixtures", "success"), "https://example.com/", "--compression", "zstd"],
+    )
+
+    assert result.exit_code == 2
+    assert "Invalid value for '--compression': zstd requires Python 3.14 or the zstandard package" in result.stderr
+
+
+def test_sphinx_manifest(tmpdir):
+    runner = CliRunner()
+
+    base_url = "https://standard.open-contracting.org/dev/"
+    directory = os.path.join("tests", "fixtures", "success")
+    manifest = tmpdir.join("manifest.json")
+
+    # No manifest.
+    result = runner.invoke(main, ["sphinx", directory, base_url, "--manifest", str(manifest)])
+
+    actual = json.loads(result.output)
+    fingerprints = actual["fingerprints"]
+
+    assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+    assert set(fingerprints) == {"en", "es"}
+    assert actual["unchanged"] == []
+    assert set(actual["documents"]) == {"en", "es"}
+
+    # A changed language.
+    manifest.write(json.dumps({"en": fingerprints["en"], "es": "changed"}))
+    result = runner.invoke(main, ["sphinx", directory, base_url, "--manifest", str(manifest), "--format", "ndjson"])
+
+    lines = [json.loads(line) for line in result.output.splitlines()]
+
+    assert result.exit_code == 0, traceback.print_exception(*result.exc_info)
+    assert lines[0]["fingerprints"] == fingerprints
+    assert lines[0]["unchanged"] == ["en"]
+    assert {line["language"] for line in lines[1:]} == {"es"}
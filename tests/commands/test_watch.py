@@ -0,0 +1,145 @@
+import os
+import select
+import shutil
+import subprocess
+import sys
+
+from ocdsindex.__main__ import bulk, change_actions, get_monthly_index, index_directory
+from ocdsindex.crawler import Crawler
+from ocdsindex.extractors import get_extractor
+from ocdsindex.stats import Stats
+from tests import elasticsearch, search
+
+BASE_URL = "https://standard.open-contracting.org/dev/"
+
+
+def copy_fixtures(tmpdir):
+    directory = str(tmpdir.join("build"))
+    shutil.copytree(os.path.join("tests", "fixtures", "success"), directory)
+    return directory
+
+
+def edit(path, old, new):
+    with open(path) as f:
+        content = f.read()
+    with open(path, "w") as f:
+        f.write(content.replace(old, new))
+
+
+def readline(process, timeout=10):
+    # Fail instead of hanging, if the process prints nothing.
+    readable, _, _ = select.select([process.stderr], [], [], timeout)
+
+    assert readable, "no output"
+    return process.stderr.readline()
+
+
+def test_change_actions(tmpdir):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    directory = copy_fixtures(tmpdir)
+    crawler = Crawler.from_extractor(directory, BASE_URL, get_extractor("sphinx"))
+    guidance = os.path.join(directory, "en", "guidance", "index.html")
+    spanish = os.path.join(directory, "es", "index.html")
+
+    with elasticsearch(host) as es:
+        pages, failures = index_directory(es, crawler, 1577880000)
+
+        assert failures == []
+        assert list(pages[guidance][1]) == [f"{BASE_URL}en/guidance/#guidance"]
+        assert [index for _, index in pages[guidance][1].values()] == ["ocdsindex_en-0001"]
+        assert search(es, "ocdsindex_en")["total"]["value"] == 8
+        assert search(es, "ocdsindex_es")["total"]["value"] == 1
+
+        edit(guidance, "Are you new to OCDS?", "Is OCDS new to you?")
+        os.remove(spanish)
+
+        stats = Stats()
+        actions = change_actions(es, crawler, pages, {guidance: "en"}, [spanish], 1577880001, stats=stats)
+        failures = bulk(es, actions, stats=stats)
+
+        assert failures == []
+        assert stats.counters == {"index": 1, "delete": 1}
+        assert spanish not in pages
+
+        hits = {hit["_id"]: hit["_source"] for hit in search(es, "ocdsindex_en")["hits"]}
+
+        assert len(hits) == 8
+        assert hits[f"{BASE_URL}en/guidance/#guidance"]["text"].startswith("Is OCDS new to you?")
+        assert hits[f"{BASE_URL}en/guidance/#guidance"]["created_at"] == 1577880001
+        assert hits[f"{BASE_URL}en/#about"]["created_at"] == 1577880000
+        assert search(es, "ocdsindex_es")["total"]["value"] == 0
+
+        # An unchanged file is not re-indexed.
+        stats = Stats()
+        actions = change_actions(es, crawler, pages, {guidance: "en"}, [], 1577880002, stats=stats)
+
+        assert list(actions) == []
+        assert stats.counters == {"unchanged": 1}
+
+
+def test_change_actions_monthly(tmpdir):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    directory = copy_fixtures(tmpdir)
+    crawler = Crawler.from_extractor(directory, BASE_URL, get_extractor("sphinx"))
+    guidance = os.path.join(directory, "en", "guidance", "index.html")
+    page = os.path.join(directory, "en", "guidance", "page", "index.html")
+    new = os.path.join(directory, "en", "new", "index.html")
+
+    with elasticsearch(host) as es:
+        pages, failures = index_directory(es, crawler, 1577880000)
+
+        assert failures == []
+
+        # Make another index the write index of the alias.
+        assert get_monthly_index(es, "ocdsindex_en", 1580558400) == "ocdsindex_en-0001-2020.02"
+
+        edit(guidance, "Are you new to OCDS?", "Is OCDS new to you?")
+        os.remove(page)
+        os.makedirs(os.path.dirname(new))
+        shutil.copy(guidance, new)
+
+        stats = Stats()
+        actions = change_actions(es, crawler, pages, {guidance: "en", new: "en"}, [page], 1580558401, stats=stats)
+        failures = bulk(es, actions, stats=stats)
+
+        assert failures == []
+        assert stats.counters == {"index": 2, "delete": 1}
+        assert [index for _, index in pages[guidance][1].values()] == ["ocdsindex_en-0001"]
+        assert [index for _, index in pages[new][1].values()] == ["ocdsindex_en-0001-2020.02"]
+
+        hits = {hit["_id"]: hit for hit in search(es, "ocdsindex_en")["hits"]}
+
+        # The changed document is updated, and the removed document is deleted, in the original index.
+        assert len(hits) == 8
+        assert hits[f"{BASE_URL}en/guidance/#guidance"]["_index"] == "ocdsindex_en-0001"
+        assert hits[f"{BASE_URL}en/guidance/#guidance"]["_source"]["text"].startswith("Is OCDS new to you?")
+        assert hits[f"{BASE_URL}en/new/#guidance"]["_index"] == "ocdsindex_en-0001-2020.02"
+        assert f"{BASE_URL}en/guidance/page/#design" not in hits
+
+
+def test_watch(tmpdir):
+    host = os.getenv("ELASTICSEARCH_URL", "https://localhost:9200")
+
+    directory = copy_fixtures(tmpdir)
+    args = ["watch", directory, BASE_URL, host, "--poll", "--interval", "0.05", "--debounce", "0.2"]
+
+    with elasticsearch(host) as es:
+        process = subprocess.Popen([sys.executable, "-m", "ocdsindex", *args], stderr=subprocess.PIPE, text=True)
+        try:
+            assert readline(process) == "indexed files: 6, watching for changes\n"
+
+            edit(
+                os.path.join(directory, "en", "guidance", "index.html"), "Are you new to OCDS?", "Is OCDS new to you?"
+            )
+
+            assert readline(process) == "changed files: 1, deleted files: 0\n"
+        finally:
+            process.terminate()
+            process.wait()
+            process.stderr.close()
+
+        hits = {hit["_id"]: hit["_source"] for hit in search(es, "ocdsindex_en")["hits"]}
+
+        assert hits[f"{BASE_URL}en/guidance/#guidance"]["text"].startswith("Is OCDS new to you?")
@@ -0,0 +1,35 @@
+from benchmarks.generate import generate
+from benchmarks.stages import run
+from ocdsindex.crawler import Crawler
+from ocdsindex.extract import extract_sphinx
+
+
+def test_generate(tmpdir):
+    assert generate(str(tmpdir), pages=3, languages=2, depth=2, sections=2) == 6
+
+    documents = Crawler(str(tmpdir), "https://example.com/", extract_sphinx).get_documents_by_language()
+
+    assert set(documents) == {"en", "es"}
+    # Each page has 1 section at depth 1 and 2 sections at depth 2.
+    assert len(documents["en"]) == 9
+    assert {
+        "url": "https://example.com/en/group-0/page-0/#page-0-1",
+        "title": "Page 0 - Section page-0-1",
+    } in [{"url": document["url"], "title": document["title"]} for document in documents["en"]]
+
+
+def test_run():
+    report = run(pages=5, languages=2, depth=2, args=["--chunk-size", "10"])
+
+    assert report["files"] == 10
+    for stage in ("crawl", "extract", "index"):
+        assert report[stage]["documents"] == 30
+        assert report[stage]["documents_per_second"] > 0
+        assert report[stage]["peak_rss_bytes"] > 0
+    assert report["index"]["bulk_requests"] == 3
+    assert report["serialize"]["documents"] == 30
+    assert (
+        report["serialize"]["formats"]["ndjson+relative+gzip"]["bytes"]
+        < report["serialize"]["formats"]["ndjson"]["bytes"]
+    )
+    assert report["index"]["bytes_received"] > 0
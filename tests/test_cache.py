@@ -0,0 +1,89 @@
+import os
+
+from ocdsindex.cache import Cache
+
+
+def test_get_set(tmpdir):
+    path = tmpdir.join("index.html")
+    path.write("<p>Hello</p>")
+
+    with Cache(str(tmpdir.join("cache"))) as cache:
+        assert cache.get("key", str(path)) is None
+
+        cache.set("key", str(path), [{"text": "Hello"}])
+
+        assert cache.get("key", str(path)) == [{"text": "Hello"}]
+        assert cache.get("other", str(path)) is None
+
+    with Cache(str(tmpdir.join("cache"))) as cache:
+        assert cache.get("key", str(path)) == [{"text": "Hello"}]
+
+
+def test_get_touched(tmpdir):
+    path = tmpdir.join("index.html")
+    path.write("<p>Hello</p>")
+
+    with Cache(str(tmpdir.join("cache"))) as cache:
+        cache.set("key", str(path), [{"text": "Hello"}])
+
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+        assert cache.get("key", str(path)) == [{"text": "Hello"}]
+
+
+def test_get_changed(tmpdir):
+    path = tmpdir.join("index.html")
+    path.write("<p>Hello</p>")
+
+    with Cache(str(tmpdir.join("cache"))) as cache:
+        cache.set("key", str(path), [{"text": "Hello"}])
+
+        stat = os.stat(path)
+        path.write("<p>Howdy</p>")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+        assert cache.get("key", str(path)) is None
+
+        path.write("<p>Hello, world</p>")
+
+        assert cache.get("key", str(path)) is None
+
+
+def test_prune(tmpdir):
+    path = tmpdir.join("index.html")
+    path.write("<p>Hello</p>")
+
+    with Cache(str(tmpdir.join("cache")), max_size=50) as cache:
+        cache.set("old", str(path), [{"text": "x" * 20}])
+        cache.set("new", str(path), [{"text": "x" * 20}])
+
+    with Cache(str(tmpdir.join("cache"))) as cache:
+        assert cache.get("old", str(path)) is None
+        assert cache.get("new", str(path)) == [{"text": "x" * 20}]
+
+
+def test_concurrent(tmpdir):
+    path = tmpdir.join("index.html")
+    path.write("<p>Hello</p>")
+
+    with Cache(str(tmpdir.join("cache"))) as cache, Cache(str(tmpdir.join("cache"))) as other:
+        cache.set("key", str(path), [{"text": "Hello"}])
+        other.set("other", str(path), [{"text": "Hello"}])
+
+        assert other.get("key", str(path)) == [{"text": "Hello"}]
+        assert cache.get("other", str(path)) == [{"text": "Hello"}]
+
+
+def test_has_load(tmpdir):
+    path = tmpdir.join("index.html")
+    path.write("<p>Hello</p>")
+
+    with Cache(str(tmpdir.join("cache"))) as cache:
+        assert not cache.has("key", str(path))
+        assert cache.load("key") is None
+
+        cache.set("key", str(path), [{"text": "Hello"}])
+
+        assert cache.has("key", str(path))
+        assert cache.load("key") == [{"text": "Hello"}]
@@ -1,7 +1,10 @@
 import os.path
+import shutil
 
+from ocdsindex.cache import Cache
 from ocdsindex.crawler import Crawler
-from ocdsindex.extract import extract_sphinx
+from ocdsindex.extract import extract_sphinx, extract_sphinx_file
+from ocdsindex.stats import Stats
 from tests import expected
 
 
@@ -11,3 +14,164 @@ def test_get_documents_by_language():
     documents = crawler.get_documents_by_language()
 
     assert set(documents) == set(expected)
+
+
+def test_get_documents_by_language_workers():
+    base_url = "https://standard.open-contracting.org/dev/"
+    directory = os.path.join("tests", "fixtures", "success")
+    documents = Crawler(directory, base_url, extract_sphinx, workers=2).get_documents_by_language()
+
+    assert documents == Crawler(directory, base_url, extract_sphinx).get_documents_by_language()
+
+
+def test_get_documents_by_language_streaming():
+    base_url = "https://standard.open-contracting.org/dev/"
+    directory = os.path.join("tests", "fixtures", "success")
+    documents = Crawler(directory, base_url, extract_sphinx_file, streaming=True).get_documents_by_language()
+
+    assert documents == Crawler(directory, base_url, extract_sphinx).get_documents_by_language()
+
+
+def test_get_documents():
+    base_url = "https://standard.open-contracting.org/dev/"
+    crawler = Crawler(os.path.join("tests", "fixtures", "success"), base_url, extract_sphinx)
+    documents = crawler.get_documents_by_language()
+
+    assert list(crawler.get_documents()) == [
+        (language_code, document) for language_code, values in documents.items() for document in values
+    ]
+
+
+def test_get_documents_by_path():
+    base_url = "https://standard.open-contracting.org/dev/"
+    directory = os.path.join("tests", "fixtures", "success")
+    crawler = Crawler(directory, base_url, extract_sphinx)
+
+    for language_code, path, documents in crawler.get_documents_by_path():
+        assert path.startswith(os.path.join(directory, language_code, ""))
+        assert documents == crawler.get_documents_from_file(path)
+
+
+def test_get_documents_by_language_cache(tmpdir):
+    base_url = "https://standard.open-contracting.org/dev/"
+    directory = os.path.join("tests", "fixtures", "success")
+    calls = []
+
+    def extract(url, tree):
+        calls.append(url)
+        return extract_sphinx(url, tree)
+
+    with Cache(str(tmpdir)) as cache:
+        cold = Crawler(directory, base_url, extract, cache=cache).get_documents_by_language()
+
+    count = len(calls)
+
+    with Cache(str(tmpdir)) as cache:
+        warm = Crawler(directory, base_url, extract, cache=cache).get_documents_by_language()
+
+    assert warm == cold
+    assert count > 0
+    assert len(calls) == count
+
+
+def test_get_documents_by_language_cache_workers(tmpdir):
+    base_url = "https://standard.open-contracting.org/dev/"
+    directory = os.path.join("tests", "fixtures", "success")
+
+    # The cache isn't sent to worker processes.
+    with Cache(str(tmpdir)) as cache:
+        cold = Crawler(directory, base_url, extract_sphinx, workers=2, cache=cache).get_documents_by_language()
+
+    with Cache(str(tmpdir)) as cache:
+        warm = Crawler(directory, base_url, extract_sphinx, workers=2, cache=cache).get_documents_by_language()
+
+    assert warm == cold == Crawler(directory, base_url, extract_sphinx).get_documents_by_language()
+
+
+def test_get_documents_by_path_cache(monkeypatch, tmpdir):
+    base_url = "https://standard.open-contracting.org/dev/"
+    directory = os.path.join("tests", "fixtures", "success")
+
+    with Cache(str(tmpdir)) as cache:
+        crawler = Crawler(directory, base_url, extract_sphinx, cache=cache)
+        expected = list(crawler.get_documents_by_path())
+
+        # Files that aren't HTML aren't cached.
+        path = os.path.join(directory, "en", "ignore.json")
+        assert not cache.has(crawler.get_cache_key(path), path)
+
+        # The cached documents are loaded as they are yielded.
+        loaded = []
+        load = cache.load
+        monkeypatch.setattr(cache, "load", lambda key: loaded.append(key) or load(key))
+
+        documents = crawler.get_documents_by_path()
+        first = next(documents)
+
+        assert len(loaded) == 1
+        assert [first, *documents] == expected
+
+
+def test_get_documents_by_language_stats(tmpdir):
+    base_url = "https://standard.open-contracting.org/dev/"
+    directory = os.path.join("tests", "fixtures", "success")
+    stats = Stats(slowest=2)
+
+    with Cache(str(tmpdir)) as cache:
+        # The cache and stats aren't sent to worker processes.
+        crawler = Crawler(directory, base_url, extract_sphinx, workers=2, cache=cache, stats=stats)
+        documents = crawler.get_documents_by_language()
+
+    actual = stats.as_dict()
+
+    assert documents == Crawler(directory, base_url, extract_sphinx).get_documents_by_language()
+    assert set(actual["stages"]) == {"crawl", "cache", "parse", "extract"}
+    assert actual["stages"]["parse"]["calls"] == 7
+    # Files that aren't HTML aren't cached.
+    assert actual["counters"] == {"cache_misses": 6, "files": 7}
+    assert actual["documents"] == {"en": 9, "es": 1}
+    assert len(actual["slowest_files"]) == 2
+    assert actual["slowest_files"][0]["seconds"] >= actual["slowest_files"][1]["seconds"]
+
+
+def test_get_documents_by_language_languages():
+    base_url = "https://standard.open-contracting.org/dev/"
+    crawler = Crawler(os.path.join("tests", "fixtures", "success"), base_url, extract_sphinx, languages=["es"])
+    documents = crawler.get_documents_by_language()
+
+    assert documents == {"es": expected["es"]}
+
+
+def test_get_fingerprints(tmpdir):
+    base_url = "https://standard.open-contracting.org/dev/"
+    directory = str(tmpdir.join("build"))
+    shutil.copytree(os.path.join("tests", "fixtures", "success"), directory)
+    crawler = Crawler(directory, base_url, extract_sphinx)
+
+    stat = crawler.get_fingerprints()
+    content = crawler.get_fingerprints(content=True)
+
+    assert set(stat) == {"en", "es"}
+    assert set(content) == {"en", "es"}
+    assert crawler.get_fingerprints() == stat
+    assert crawler.get_fingerprints(content=True) == content
+
+    other = Crawler(directory, "https://standard.open-contracting.org/latest/", extract_sphinx)
+
+    assert other.get_fingerprints(content=True)["en"] != content["en"]
+
+    # Rewrite a file with the same content.
+    path = os.path.join(directory, "es", "index.html")
+    os.utime(path, ns=(0, 0))
+    fingerprints = crawler.get_fingerprints()
+
+    assert fingerprints["en"] == stat["en"]
+    assert fingerprints["es"] != stat["es"]
+    assert crawler.get_fingerprints(content=True) == content
+
+    # Change a file.
+    with open(path, "a") as f:
+        f.write("\n")
+
+    assert crawler.get_fingerprints(content=True)["en"] == content["en"]
+    assert crawler.get_fingerprints(content=True)["es"] != content["es"]
@@ -0,0 +1,65 @@
+import io
+import json
+import os.path
+from collections import defaultdict
+
+import pytest
+
+from ocdsindex.extension_explorer import ExtensionExplorer, iterload
+
+path = os.path.join("tests", "fixtures", "extension_explorer", "extensions.json")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 65536])
+def test_iterload(chunk_size):
+    with open(path) as f:
+        expected = json.load(f)
+
+    with open(path) as f:
+        assert dict(iterload(f, chunk_size=chunk_size)) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 65536])
+def test_iterload_numbers(chunk_size):
+    assert list(iterload(io.StringIO('{"a": 1234567890, "b": -1.5e10, "c": []}'), chunk_size=chunk_size)) == [
+        ("a", 1234567890),
+        ("b", -1.5e10),
+        ("c", []),
+    ]
+
+
+# Split numbers at ".", "e" and "-".
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 5, 6])
+@pytest.mark.parametrize("text", ['{"a": 1.5}', '{"e0": 1e-06}', '{"a":  -12}', '{"a": 1.5e-3 }'])
+def test_iterload_numbers_split(chunk_size, text):
+    assert dict(iterload(io.StringIO(text), chunk_size=chunk_size)) == json.loads(text)
+
+
+def test_iterload_empty():
+    assert list(iterload(io.StringIO(" {} "))) == []
+
+
+@pytest.mark.parametrize("text", ["", "[]", '{"a": 1', '{"a" 1}', '{"a": 1,}'])
+def test_iterload_error(text):
+    with pytest.raises(json.JSONDecodeError):
+        list(iterload(io.StringIO(text), chunk_size=2))
+
+
+def test_get_documents_by_language_workers():
+    with open(path) as f:
+        documents = ExtensionExplorer(f, workers=2).get_documents_by_language()
+
+    with open(path) as f:
+        assert documents == ExtensionExplorer(f).get_documents_by_language()
+
+
+def test_get_documents():
+    with open(path) as f:
+        expected = ExtensionExplorer(f).get_documents_by_language()
+
+    actual = defaultdict(list)
+    with open(path) as f:
+        for language_code, document in ExtensionExplorer(f).get_documents():
+            actual[language_code].append(document)
+
+    assert actual == expected
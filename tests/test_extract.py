@@ -1,7 +1,10 @@
+import os.path
+
+import lxml.html
 import pytest
 
 from ocdsindex.exceptions import MissingHeadingError
-from ocdsindex.extract import extract_sphinx
+from ocdsindex.extract import extract_extension_explorer, extract_sphinx, extract_sphinx_file
 from tests import expected, parse
 
 
@@ -34,3 +37,107 @@ def test_extract_sphinx_error(caplog):
     assert len(caplog.records) == 1
     assert caplog.records[0].levelname == "ERROR"
     assert caplog.records[0].message == 'No heading found\n<section id="error">\n    No heading.\n  </section>\n'
+
+
+def test_extract_sphinx_nested():
+    url = "https://standard.open-contracting.org/dev/en/reference/"
+    documents = extract_sphinx(url, parse("nested", "index.html"))
+
+    assert documents == [
+        {
+            "url": f"{url}#reference",
+            "title": "Reference",
+            "text": "Leading text\nafter a comment.\nA paragraph with inline markup,\nand a line break.\n"
+            "indexed = True\nTrailing text.",
+        },
+        {
+            "url": f"{url}#level-2",
+            "title": "Reference - Level 2",
+            # The text content of a child element includes any sections that it contains.
+            "text": "Level 2 text.\nWrapper text.\nWrapped\nWrapped text.",
+        },
+        {"url": f"{url}#wrapped", "title": "Reference - Wrapped", "text": "Wrapped text."},
+        {"url": f"{url}#level-3", "title": "Reference - Level 3", "text": "Level 3 text."},
+        {"url": f"{url}#level-4", "title": "Reference - Level 4", "text": ""},
+        {"url": f"{url}#level-5", "title": "Reference - Level 5", "text": ""},
+        {"url": f"{url}#level-6", "title": "Reference - Level 6", "text": "Level 6 text."},
+    ]
+
+
+def test_extract_sphinx_no_sections():
+    tree = lxml.html.fromstring("<html><head><title>Empty</title></head><body><div role='main'></div></body></html>")
+
+    assert extract_sphinx("https://standard.open-contracting.org/dev/en/", tree) == []
+
+
+@pytest.mark.parametrize(
+    "parts",
+    [
+        ("nested", "index.html"),
+        ("success", "en", "index.html"),
+        ("success", "en", "guidance", "index.html"),
+        ("success", "en", "schema", "index.html"),
+        ("success", "es", "index.html"),
+    ],
+)
+def test_extract_sphinx_file(parts):
+    url = "https://standard.open-contracting.org/dev/en/"
+
+    assert extract_sphinx_file(url, os.path.join("tests", "fixtures", *parts)) == extract_sphinx(url, parse(*parts))
+
+
+def test_extract_sphinx_file_error(caplog):
+    with pytest.raises(MissingHeadingError):
+        extract_sphinx_file(
+            "https://standard.open-contracting.org/fail/", os.path.join("tests", "fixtures", "failure", "index.html")
+        )
+
+    assert len(caplog.records) == 1
+    assert caplog.records[0].levelname == "ERROR"
+    assert caplog.records[0].message == 'No heading found\n<section id="error">\n    No heading.\n  </section>\n'
+
+
+def test_extract_extension_explorer():
+    url = "https://extensions.open-contracting.org/en/extensions/bids/v1.1.5/"
+    text = """Text before a heading, with a [link](https://example.com) and `code`.
+
+# Bid statistics and details
+
+Adds **bid** statistics.
+
+## Example
+
+```json
+{"bids": {}}
+```
+
+```python
+indexed = True
+```
+
+- An *item*
+- <b>Another</b> item
+
+## Example ##
+### Empty
+"""
+
+    assert extract_extension_explorer(url, text, "Bid statistics and details") == [
+        {
+            "url": url,
+            "title": "Bid statistics and details",
+            "text": "Text before a heading, with a link and code.",
+        },
+        {
+            "url": f"{url}#bid-statistics-and-details",
+            "title": "Bid statistics and details",
+            "text": "Adds bid statistics.",
+        },
+        {
+            "url": f"{url}#example",
+            "title": "Bid statistics and details - Example",
+            "text": "indexed = True\nAn item\nAnother item",
+        },
+        {"url": f"{url}#example-1", "title": "Bid statistics and details - Example", "text": ""},
+        {"url": f"{url}#empty", "title": "Bid statistics and details - Empty", "text": ""},
+    ]
@@ -0,0 +1,70 @@
+from importlib.metadata import EntryPoint
+
+import pytest
+
+from ocdsindex import extractors
+from ocdsindex.allow import allow_sphinx
+from ocdsindex.exceptions import InvalidExtractorError, UnknownExtractorError
+from ocdsindex.extract import extract_sphinx, extract_sphinx_file
+from ocdsindex.extractors import Extractor, get_extractor, get_extractors
+
+extractor = Extractor("custom", extract_sphinx)
+invalid = extract_sphinx
+
+
+@pytest.fixture
+def entry_points(monkeypatch):
+    values = [
+        EntryPoint("custom", "tests.test_extractors:extractor", extractors.ENTRY_POINT_GROUP),
+        # An entry point can't override a built-in extractor.
+        EntryPoint("sphinx", "tests.test_extractors:extractor", extractors.ENTRY_POINT_GROUP),
+    ]
+
+    def _entry_points(*, group, name=None):
+        assert group == extractors.ENTRY_POINT_GROUP
+        return [entry_point for entry_point in values if name in {None, entry_point.name}]
+
+    monkeypatch.setattr(extractors, "entry_points", _entry_points)
+    return values
+
+
+def test_get_extractor():
+    assert get_extractor("sphinx") == Extractor("sphinx", extract_sphinx, allow_sphinx)
+    assert get_extractor("sphinx-streaming") == Extractor(
+        "sphinx-streaming", extract_sphinx_file, allow_sphinx, streaming=True
+    )
+
+
+def test_get_extractor_unknown():
+    with pytest.raises(UnknownExtractorError) as excinfo:
+        get_extractor("nonexistent")
+
+    assert excinfo.value.args == ("nonexistent",)
+
+
+def test_get_extractor_entry_point(entry_points):
+    assert get_extractor("custom") is extractor
+
+
+def test_get_extractors(entry_points):
+    assert get_extractors() == {
+        "sphinx": get_extractor("sphinx"),
+        "sphinx-streaming": get_extractor("sphinx-streaming"),
+        "custom": extractor,
+    }
+
+
+def test_get_extractor_entry_point_builtin(entry_points):
+    assert get_extractor("sphinx") == get_extractors()["sphinx"] == Extractor("sphinx", extract_sphinx, allow_sphinx)
+
+
+def test_get_extractor_entry_point_invalid(entry_points):
+    entry_points.append(EntryPoint("invalid", "tests.test_extractors:invalid", extractors.ENTRY_POINT_GROUP))
+
+    with pytest.raises(InvalidExtractorError) as excinfo:
+        get_extractor("invalid")
+
+    assert str(excinfo.value).startswith("the 'invalid' entry point is not an Extractor: <function extract_sphinx")
+
+    with pytest.raises(InvalidExtractorError):
+        get_extractors()
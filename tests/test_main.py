@@ -0,0 +1,36 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+# Print the heavy dependencies that are imported, after running a command, to standard error.
+SCRIPT = """
+import json
+import sys
+
+from ocdsindex.__main__ import main
+
+try:
+    main(sys.argv[1:])
+except SystemExit:
+    pass
+
+imported = [name for name in ("elastic_transport", "elasticsearch", "lxml") if name in sys.modules]
+print(json.dumps(imported), file=sys.stderr)
+"""
+
+
+@pytest.mark.parametrize(
+    ("args", "expected"),
+    [
+        (["--help"], []),
+        (["index", "--help"], []),
+        (["sphinx", "--help"], []),
+        (["sphinx", "tests/fixtures/success", "https://standard.open-contracting.org/dev/"], ["lxml"]),
+    ],
+)
+def test_lazy_imports(args, expected):
+    result = subprocess.run([sys.executable, "-c", SCRIPT, *args], capture_output=True, check=True, text=True)
+
+    assert json.loads(result.stderr) == expected
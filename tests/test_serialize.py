@@ -0,0 +1,131 @@
+import gzip
+import io
+import json
+import os.path
+
+import pytest
+
+from ocdsindex import serialize
+from ocdsindex.exceptions import MissingDependencyError
+from ocdsindex.serialize import compress, decompress, dump_json, dump_ndjson, load
+from tests import expected
+
+base_url = "https://standard.open-contracting.org/dev/"
+
+
+def pairs(documents):
+    return [(language_code, document) for language_code, values in documents.items() for document in values]
+
+
+def read(file):
+    header, groups = load(file)
+    return header, [(language_code, list(documents)) for language_code, documents in groups]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_load_json(indent):
+    file = io.StringIO()
+    json.dump({"base_url": base_url, "created_at": 1577880000, "documents": expected}, file, indent=indent)
+    file.seek(0)
+
+    header, groups = read(file)
+
+    assert header == {"base_url": base_url, "created_at": 1577880000}
+    assert groups == list(expected.items())
+
+
+def test_load_json_fixture():
+    with open(os.path.join("tests", "fixtures", "success", "data.json")) as f:
+        header, groups = read(f)
+
+    assert header == {"base_url": base_url, "created_at": 1577880000}
+    assert [language_code for language_code, _ in groups] == ["es", "en"]
+
+
+def test_dump_json():
+    file = io.StringIO()
+    dump_json(file, base_url, 1577880000, expected)
+
+    assert json.loads(file.getvalue()) == {"base_url": base_url, "created_at": 1577880000, "documents": expected}
+
+
+def test_dump_ndjson():
+    file = io.StringIO()
+    dump_ndjson(file, base_url, 1577880000, pairs(expected))
+
+    lines = file.getvalue().splitlines()
+
+    assert len(lines) == 10
+    assert json.loads(lines[0]) == {"base_url": base_url, "created_at": 1577880000}
+    assert json.loads(lines[1]) == {"language": "en", **expected["en"][0]}
+
+    file.seek(0)
+    header, groups = read(file)
+
+    assert header == {"base_url": base_url, "created_at": 1577880000}
+    assert groups == list(expected.items())
+
+
+@pytest.mark.parametrize("dump", [dump_json, dump_ndjson])
+def test_relative_urls(dump):
+    documents = {
+        "en": [*expected["en"], {"url": "https://example.com/#other", "title": "Other", "text": ""}],
+        "es": expected["es"],
+    }
+
+    file = io.StringIO()
+    dump(file, base_url, 1577880000, documents if dump is dump_json else pairs(documents), relative_urls=True)
+    value = file.getvalue()
+
+    assert f'"{base_url}en/' not in value
+    assert '"url": "en/#about"' in value
+    assert '"url": "https://example.com/#other"' in value
+
+    file.seek(0)
+    header, groups = read(file)
+
+    assert header == {"base_url": base_url, "created_at": 1577880000}
+    assert groups == list(documents.items())
+
+
+@pytest.mark.parametrize(
+    "compression",
+    [
+        "gzip",
+        pytest.param("zstd", marks=pytest.mark.skipif(serialize.zstd is None, reason="zstd is not available")),
+    ],
+)
+def test_compress(compression):
+    binary = io.BytesIO()
+    with compress(binary, compression) as file:
+        dump_ndjson(file, base_url, 1577880000, pairs(expected))
+
+    assert not binary.closed
+
+    with decompress(io.BufferedReader(io.BytesIO(binary.getvalue()))) as file:
+        header, groups = read(file)
+
+    assert header == {"base_url": base_url, "created_at": 1577880000}
+    assert groups == list(expected.items())
+
+
+def test_decompress_gzip():
+    with decompress(io.BufferedReader(io.BytesIO(gzip.compress(b'{"base_url": "", "created_at": 0}\n')))) as file:
+        assert read(file) == ({"base_url": "", "created_at": 0}, [])
+
+
+def test_decompress_uncompressed():
+    with open(os.path.join("tests", "fixtures", "success", "data.json"), "rb") as f, decompress(f) as file:
+        header, groups = read(file)
+
+    assert header == {"base_url": base_url, "created_at": 1577880000}
+    assert [language_code for language_code, _ in groups] == ["es", "en"]
+
+
+def test_compress_zstd_missing(monkeypatch):
+    monkeypatch.setattr(serialize, "zstd", None)
+
+    with pytest.raises(MissingDependencyError) as excinfo, compress(io.BytesIO(), "zstd"):
+        pass
+
+    assert str(excinfo.value) == "zstd requires Python 3.14 or the zstandard package"
@@ -0,0 +1,46 @@
+import pytest
+
+from ocdsindex.stats import NULL, Stats
+
+
+def test_stats():
+    stats = Stats(slowest=2)
+
+    with stats.timer("parse"):
+        pass
+    stats.add_time("parse", 1.0)
+    stats.increment("files")
+    stats.increment("files", 2)
+    stats.add_documents("en", 3)
+    stats.add_documents("en", 1)
+    for path, seconds in (("a", 1.0), ("b", 3.0), ("c", 2.0)):
+        stats.add_file(path, seconds)
+    stats.add_bulk_request(2, 100, 0.5)
+    stats.add_bulk_request(1, 200, 0.25)
+    stats.add_took("delete_by_query", {"took": 5})
+    stats.add_took("delete_by_query", {"took": 7})
+    stats.add_took("reindex", {"error": {}})
+
+    actual = stats.as_dict()
+
+    assert actual["seconds"] > 0
+    assert actual["stages"] == {"parse": {"calls": 2, "seconds": pytest.approx(1.0, abs=0.01)}}
+    assert actual["counters"] == {"files": 3}
+    assert actual["documents"] == {"en": 4}
+    assert actual["slowest_files"] == [{"path": "b", "seconds": 3.0}, {"path": "c", "seconds": 2.0}]
+    assert actual["bulk_requests"] == {
+        "requests": 2,
+        "actions": 3,
+        "bytes": 300,
+        "max_actions": 2,
+        "max_bytes": 200,
+        "seconds": 0.75,
+    }
+    assert actual["took"] == {"delete_by_query": {"calls": 2, "milliseconds": 12}}
+
+
+def test_null_stats():
+    with NULL.timer("parse"):
+        NULL.increment("files")
+
+    assert not NULL.enabled
@@ -0,0 +1,94 @@
+import os
+import shutil
+import sys
+import threading
+
+import pytest
+
+from ocdsindex.crawler import Crawler
+from ocdsindex.extract import extract_sphinx
+from ocdsindex.watch import Inotify, Poller, Watcher, diff, snapshot
+
+
+@pytest.fixture
+def crawler(tmpdir):
+    directory = str(tmpdir.join("build"))
+    shutil.copytree(os.path.join("tests", "fixtures", "success"), directory)
+    return Crawler(directory, "https://standard.open-contracting.org/dev/", extract_sphinx)
+
+
+def get_changes(changes):
+    # Fail instead of hanging, if no changes are reported.
+    results = []
+    thread = threading.Thread(target=lambda: results.append(next(changes)), daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+
+    assert results, "no changes reported"
+    return results[0]
+
+
+def test_diff(crawler):
+    old = snapshot(crawler.get_paths_by_language())
+
+    with open(os.path.join(crawler.directory, "en", "index.html"), "a") as f:
+        f.write("\n")
+    with open(os.path.join(crawler.directory, "en", "new.html"), "w") as f:
+        f.write("<html></html>")
+    os.remove(os.path.join(crawler.directory, "es", "index.html"))
+
+    changed, deleted = diff(old, snapshot(crawler.get_paths_by_language()))
+
+    assert changed == {
+        os.path.join(crawler.directory, "en", "index.html"): "en",
+        os.path.join(crawler.directory, "en", "new.html"): "en",
+    }
+    assert deleted == [os.path.join(crawler.directory, "es", "index.html")]
+
+
+def test_diff_unchanged(crawler):
+    files = snapshot(crawler.get_paths_by_language())
+
+    assert diff(files, files) == ({}, [])
+
+
+@pytest.mark.parametrize(
+    "poll",
+    [
+        True,
+        pytest.param(False, marks=pytest.mark.skipif(not sys.platform.startswith("linux"), reason="requires Linux")),
+    ],
+)
+def test_watcher(crawler, poll):
+    with Watcher(crawler, debounce=0.2, poll=poll, interval=0.05) as watcher:
+        assert isinstance(watcher.notifier, Poller if poll else Inotify)
+
+        changes = watcher.get_changes()
+
+        # Changes in a new directory.
+        os.mkdir(os.path.join(crawler.directory, "en", "new"))
+        with open(os.path.join(crawler.directory, "en", "new", "index.html"), "w") as f:
+            f.write("<html></html>")
+        os.remove(os.path.join(crawler.directory, "es", "index.html"))
+
+        assert get_changes(changes) == (
+            {os.path.join(crawler.directory, "en", "new", "index.html"): "en"},
+            [os.path.join(crawler.directory, "es", "index.html")],
+        )
+
+        # Changes in the new directory, which is watched.
+        with open(os.path.join(crawler.directory, "en", "new", "index.html"), "a") as f:
+            f.write("\n")
+
+        assert get_changes(changes) == ({os.path.join(crawler.directory, "en", "new", "index.html"): "en"}, [])
+
+
+def test_watcher_timeout(crawler):
+    with Watcher(crawler, debounce=0.2, poll=True, interval=0.05) as watcher:
+        changes = watcher.get_changes(timeout=0.1)
+
+        assert get_changes(changes) == ({}, [])
+
+        os.remove(os.path.join(crawler.directory, "es", "index.html"))
+
+        assert get_changes(changes) == ({}, [os.path.join(crawler.directory, "es", "index.html")])